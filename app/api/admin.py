@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hmac
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+from config.settings import Settings
+from monitoring.memory import MemoryProfiler
+from monitoring.watchdog import LoopWatchdog
+from runtime.speedups import json_response
+from services.job_processor import JobProcessor
+from storage.maintenance import DatabaseMaintenance
+from storage.sqlite_impl import SQLiteRepository, quota_day
+
+
+class AdminApi:
+    def __init__(
+        self,
+        settings: Settings,
+        processor: JobProcessor,
+        repo: SQLiteRepository,
+        maintenance: DatabaseMaintenance,
+        watchdog: LoopWatchdog,
+    ) -> None:
+        self._token = (
+            settings.admin_token.get_secret_value() if settings.admin_token else None
+        )
+        self._processor = processor
+        self._repo = repo
+        self._memory = MemoryProfiler(processor)
+        self._maintenance = maintenance
+        self._watchdog = watchdog
+
+    def routes(self) -> list[web.RouteDef]:
+        return [
+            web.get("/admin/apply-latency", self.apply_latency),
+            web.get("/admin/pipeline", self.pipeline),
+            web.get("/admin/stats", self.stats),
+            web.get("/admin/memory", self.memory),
+            web.post("/admin/memory/tracemalloc/start", self.tracemalloc_start),
+            web.post("/admin/memory/tracemalloc/stop", self.tracemalloc_stop),
+            web.post("/admin/memory/profile-cycle", self.profile_cycle),
+            web.get("/admin/blocking", self.blocking),
+            web.get("/admin/maintenance", self.maintenance),
+            web.post("/admin/maintenance/backup", self.backup),
+            web.post("/admin/maintenance/run", self.run_maintenance),
+        ]
+
+    def _check(self, request: web.Request) -> None:
+        given = request.headers.get("X-Admin-Token", "")
+        if not self._token or not hmac.compare_digest(given, self._token):
+            raise web.HTTPForbidden()
+
+    async def apply_latency(self, request: web.Request) -> web.Response:
+        self._check(request)
+        users = {
+            str(uid): {k: round(v, 3) for k, v in stats.items()}
+            for uid, stats in self._processor.apply_latency().items()
+        }
+        return json_response({"unit": "sec", "users": users})
+
+    async def pipeline(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return json_response(
+            {
+                "cycle_running": self._processor.is_running,
+                "stages": self._processor.pipeline_stats(),
+            }
+        )
+
+    async def stats(self, request: web.Request) -> web.Response:
+        self._check(request)
+        try:
+            days = min(max(int(request.query.get("days", "7")), 1), 366)
+        except ValueError:
+            raise web.HTTPBadRequest(text="days must be an integer")
+        since = quota_day(datetime.now(timezone.utc) - timedelta(days=days - 1))
+        failures: dict[str, dict[str, int]] = {}
+        for day, reason, count in await self._repo.global_failures(since):
+            failures.setdefault(day, {})[reason] = count
+        return json_response(
+            {
+                "since": since,
+                "days": [
+                    {**asdict(d), "failure_reasons": failures.get(d.day, {})}
+                    for d in await self._repo.global_stats(since)
+                ],
+            }
+        )
+
+    async def memory(self, request: web.Request) -> web.Response:
+        self._check(request)
+        body = self._memory.summary()
+        body["last_profile"] = self._memory.last_profile
+        return json_response(body)
+
+    async def tracemalloc_start(self, request: web.Request) -> web.Response:
+        self._check(request)
+        try:
+            frames = min(max(int(request.query.get("frames", "1")), 1), 50)
+        except ValueError:
+            raise web.HTTPBadRequest(text="frames must be an integer")
+        self._memory.start(frames)
+        return json_response({"tracing": self._memory.tracing})
+
+    async def tracemalloc_stop(self, request: web.Request) -> web.Response:
+        self._check(request)
+        self._memory.stop()
+        return json_response({"tracing": self._memory.tracing})
+
+    async def profile_cycle(self, request: web.Request) -> web.Response:
+        self._check(request)
+        if self._processor.is_running:
+            raise web.HTTPConflict(text="a cycle is already running")
+        return json_response(await self._memory.profile_cycle())
+
+    async def blocking(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return json_response(self._watchdog.report())
+
+    async def maintenance(self, request: web.Request) -> web.Response:
+        self._check(request)
+        m = self._maintenance
+        return json_response(
+            {
+                "last_backup_at": m.last_backup_at,
+                "last_maintenance_at": m.last_maintenance_at,
+                "reports": m.reports,
+            }
+        )
+
+    async def backup(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return json_response(await self._maintenance.backup())
+
+    async def run_maintenance(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return json_response(await self._maintenance.run_maintenance())
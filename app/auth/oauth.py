@@ -1,4 +1,5 @@
-import asyncio
+import logging
+import time
 import urllib.parse
 from aiohttp import web
 import httpx
@@ -8,7 +9,28 @@ from datetime import datetime, timezone, timedelta
 from config.settings import Settings
 from hh.client import HHClient
 from storage.sqlite_impl import SQLiteRepository, Token
-from auth.state import generage_state
+from auth.state import StateStore
+
+logger = logging.getLogger(__name__)
+
+
+# hh.ru rejected the grant: only a new /connect will help
+class TokenRevokedError(Exception):
+    def __init__(self, tg_id: int, reason: str) -> None:
+        super().__init__(f"hh.ru token of user {tg_id} is unusable: {reason}")
+        self.tg_id = tg_id
+        self.reason = reason
+
+
+# network errors and hh.ru outages, worth retrying later
+class TransientAuthError(Exception):
+    def __init__(self, tg_id: int, reason: str) -> None:
+        super().__init__(f"refreshing hh.ru token of user {tg_id} failed: {reason}")
+        self.tg_id = tg_id
+        self.reason = reason
+
+
+AuthError = TokenRevokedError | TransientAuthError
 
 
 class OAuthManager:
@@ -19,11 +41,25 @@ class OAuthManager:
         self.repo = repo
         self.bot = bot
         self.hh_client = hh_client
+        self.states = StateStore(repo, ttl=settings.oauth_state_ttl_sec)
+        self._http: httpx.AsyncClient | None = None
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=30)
+        return self._http
+
+    def start(self) -> None:
+        self.states.start()
 
-    def build_authorize_url(self, tg_id: int) -> str:
-        state = generage_state()
+    async def aclose(self) -> None:
+        self.states.stop()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
-        asyncio.create_task(self.repo.save_state(state, tg_id))
+    async def build_authorize_url(self, tg_id: int) -> str:
+        state = await self.states.create(tg_id)
 
         params = {
             "response_type": "code",
@@ -40,7 +76,7 @@ class OAuthManager:
         if not code or not state:
             return web.Response(status=400, text="Missing code or state")
 
-        tg_id = await self.repo.pop_state(state)
+        tg_id = await self.states.pop(state)
         if tg_id is None:
             return web.Response(status=400, text="Invalid state")
 
@@ -52,6 +88,8 @@ class OAuthManager:
             token_payload["expires_in"],
         )
 
+        await self.repo.clear_quarantine(tg_id)
+
         await self.bot.send_message(tg_id, "HH авторизация успешно завершена")
         return web.Response(status=200, text="Success! You can close this tab.")
 
@@ -65,17 +103,16 @@ class OAuthManager:
         }
 
         headers = {"User-Agent": "headhunter-xorbot/1.0"}
-        async with httpx.AsyncClient() as client:
-            r = await client.post(
-                "https://hh.ru/oauth/token", data=data, headers=headers
-            )
-            r.raise_for_status()
-            return r.json()
+        r = await self._client().post(
+            "https://hh.ru/oauth/token", data=data, headers=headers
+        )
+        r.raise_for_status()
+        return r.json()
 
-    async def refresh_token(self, tg_id: int) -> Token | None:
+    async def refresh_token(self, tg_id: int) -> Token:
         token = await self.repo.get_token(tg_id)
         if not token:
-            return None
+            raise TokenRevokedError(tg_id, "no_token")
         refresh_token = token.refresh_token
 
         data = {
@@ -85,24 +122,90 @@ class OAuthManager:
 
         headers = {"User-Agent": "headhunter-xorbot/1.0"}
 
-        async with httpx.AsyncClient() as client:
-            r = await client.post(
+        try:
+            r = await self._client().post(
                 "https://hh.ru/oauth/token", data=data, headers=headers
             )
-            r.raise_for_status()
-            token = r.json()
-            await self.repo.save_token(
-                tg_id,
-                token["access_token"],
-                token["refresh_token"],
-                token["expires_in"],
-            )
-            expires_at = datetime.now(timezone.utc) + timedelta(
-                seconds=token["expires_in"]
+        except httpx.TransportError as e:
+            raise await self.quarantine(
+                TransientAuthError(tg_id, type(e).__name__)
+            ) from e
+        if r.status_code == 429 or r.status_code >= 500:
+            raise await self.quarantine(TransientAuthError(tg_id, str(r.status_code)))
+        if r.is_error:
+            error, description = _oauth_error(r)
+            if description == "token not expired":
+                # hh.ru only refreshes expired tokens, the current one still works
+                return token
+            raise await self.quarantine(
+                TokenRevokedError(tg_id, f"{r.status_code} {description or error}")
             )
-            return Token(
-                telegram_user_id=tg_id,
-                access_token=token["access_token"],
-                refresh_token=token["refresh_token"],
-                expires_at=expires_at,
+        token = r.json()
+        await self.repo.save_token(
+            tg_id,
+            token["access_token"],
+            token["refresh_token"],
+            token["expires_in"],
+        )
+        await self.repo.clear_quarantine(tg_id)
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=token["expires_in"])
+        return Token(
+            telegram_user_id=tg_id,
+            access_token=token["access_token"],
+            refresh_token=token["refresh_token"],
+            expires_at=expires_at,
+        )
+
+    async def quarantine(self, error: AuthError) -> AuthError:
+        tg_id = error.tg_id
+        q = await self.repo.quarantine_user(
+            tg_id,
+            error.reason,
+            self.settings.auth_quarantine_base_sec,
+            self.settings.auth_quarantine_max_sec,
+        )
+        if q is not None:
+            logger.warning(
+                "user %s quarantined for %.0fs after %d failures: %s",
+                tg_id,
+                q.until - time.time(),
+                q.failures,
+                error,
             )
+        if isinstance(
+            error, TokenRevokedError
+        ) and await self.repo.claim_quarantine_notice(tg_id):
+            try:
+                await self.bot.send_message(
+                    tg_id,
+                    "Доступ к HH.ru отозван или устарел, отклики приостановлены. "
+                    "Авторизуйтесь заново с помощью /connect",
+                )
+            except Exception as e:
+                logger.warning(
+                    "notifying user %s about quarantine failed: %r", tg_id, e
+                )
+        return error
+
+
+def token_rejected(resp: httpx.Response) -> bool:
+    # hh.ru API answers 403 with an "oauth" error once the user revokes access
+    if resp.status_code == 401:
+        return True
+    if resp.status_code != 403:
+        return False
+    try:
+        errors = resp.json().get("errors") or []
+    except ValueError:
+        return False
+    return any(
+        e.get("type") == "oauth" and e.get("value") != "token_expired" for e in errors
+    )
+
+
+def _oauth_error(resp: httpx.Response) -> tuple[str, str]:
+    try:
+        body = resp.json()
+    except ValueError:
+        return "", ""
+    return body.get("error") or "", body.get("error_description") or ""
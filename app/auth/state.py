@@ -1,5 +1,74 @@
+import asyncio
+import logging
 import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from storage.sqlite_impl import SQLiteRepository
+
+logger = logging.getLogger(__name__)
 
 
 def generage_state() -> str:
     return secrets.token_urlsafe(16)
+
+
+class StateStore:
+    def __init__(
+        self,
+        repo: SQLiteRepository,
+        /,
+        ttl: float = 600,
+        cleanup_interval: float = 300,
+    ) -> None:
+        self._repo = repo
+        self._ttl = ttl
+        self._cleanup_interval = cleanup_interval
+        self._states: dict[str, tuple[int, float]] = {}
+        # popped states, remembered until expiry because the row delete is buffered
+        self._consumed: dict[str, float] = {}
+        self._cleanup_task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    def stop(self) -> None:
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
+
+    async def create(self, tg_id: int) -> str:
+        state = generage_state()
+        self._states[state] = (tg_id, time.monotonic() + self._ttl)
+        await self._repo.save_state(state, tg_id)
+        return state
+
+    async def pop(self, state: str) -> Optional[int]:
+        if state in self._consumed:
+            return None
+        entry = self._states.pop(state, None)
+        if entry is not None:
+            tg_id, expires_at = entry
+            self._consumed[state] = expires_at
+            self._repo.delete_state(state)
+            return tg_id if expires_at > time.monotonic() else None
+        # issued before a restart or by another process
+        return await self._repo.pop_state(state, created_after=self._cutoff())
+
+    def _cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self._ttl)
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._cleanup_interval)
+            now = time.monotonic()
+            for state in [s for s, (_, exp) in self._states.items() if exp <= now]:
+                del self._states[state]
+            for state in [s for s, exp in self._consumed.items() if exp <= now]:
+                del self._consumed[state]
+            try:
+                await self._repo.purge_states(self._cutoff())
+            except Exception:
+                logger.exception("oauth state cleanup failed")
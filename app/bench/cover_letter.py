@@ -0,0 +1,65 @@
+"""Benchmark cover letter template rendering at cycle scale.
+
+Compiles a set of user templates once, the way set_cover_letter does, then
+renders one letter per apply and reports the per-render and per-cycle cost.
+
+    python -m bench.cover_letter --applies 5000 --templates 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from bench.fakes import fake_vacancy
+from monitoring.stats import percentiles
+from services.cover_letter import compile_template, render
+
+TEMPLATES = (
+    "Здравствуйте! Меня заинтересовала вакансия «{vacancy}» в {employer}.",
+    "Добрый день, {employer}!\n\nОткликаюсь на позицию {vacancy} "
+    "({salary}). Опыт коммерческой разработки 5 лет, резюме во вложении.",
+    "Здравствуйте! Откликаюсь на вакансию. Буду рад обсудить детали.",
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--applies", type=int, default=5000, help="per cycle")
+    parser.add_argument("--templates", type=int, default=500, help="distinct users")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = [f"{TEMPLATES[i % len(TEMPLATES)]} #{i}" for i in range(args.templates)]
+    vacancies = [fake_vacancy(rng, i) for i in range(args.applies)]
+    letters = [texts[i % len(texts)] for i in range(args.applies)]
+
+    started = time.perf_counter()
+    for text in texts:
+        compile_template(text)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    cycles: list[float] = []
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        for text, v in zip(letters, vacancies):
+            render(text, v)
+        cycles.append((time.perf_counter() - started) * 1000)
+
+    p = percentiles(cycles)
+    print(
+        f"{args.templates} templates compiled in {compile_ms:.2f} ms "
+        f"({compile_ms * 1000 / args.templates:.1f} us each)"
+    )
+    print(f"{args.applies} renders per cycle, {args.rounds} cycles")
+    print(f"{'':<12}{'p50':>9}{'p95':>9}{'p99':>9}")
+    print(f"{'cycle ms':<12}{p['p50']:>9.2f}{p['p95']:>9.2f}{p['p99']:>9.2f}")
+    per = {k: v * 1000 / args.applies for k, v in p.items()}
+    print(f"{'render us':<12}{per['p50']:>9.2f}{per['p95']:>9.2f}{per['p99']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import random
+import time
+from itertools import count
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from hh.models import Vacancy
+
+WORDS = (
+    "python django fastapi flask asyncio celery postgresql redis kafka docker "
+    "kubernetes linux git rest api микросервисы бэкенд разработчик разработка "
+    "java spring kotlin golang frontend react typescript javascript vue sql "
+    "аналитик данных тестирование qa devops ci cd aws облако нагрузка опыт "
+    "команда проект продукт senior middle junior lead архитектура highload"
+).split()
+
+
+class FakeSession(BaseSession):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+        self._ids = count(1)
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: int | None = None
+    ) -> TelegramType:
+        self.calls += 1
+        if isinstance(method, SendMessage):
+            return method.__returning__.model_validate(
+                {
+                    "message_id": next(self._ids),
+                    "date": int(time.time()),
+                    "chat": {"id": method.chat_id, "type": "private"},
+                    "text": method.text,
+                },
+                context={"bot": bot},
+            )
+        return True  # type: ignore[return-value]
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: dict[str, Any] | None = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeHH:
+    async def list_resumes(self, access_token: str) -> list[dict[str, Any]]:
+        return [{"id": f"r{i}", "title": f"Резюме {i}"} for i in range(3)]
+
+    async def get_experience(self, access_token: str) -> list[dict[str, Any]]:
+        return [
+            {"id": "noExperience", "name": "Нет опыта"},
+            {"id": "between1And3", "name": "От 1 года до 3 лет"},
+        ]
+
+
+def fake_vacancy(rng: random.Random, i: int) -> Vacancy:
+    def words(n: int) -> str:
+        return " ".join(rng.choices(WORDS, k=n))
+
+    salary_from = rng.choice((None, 100_000, 150_000, 200_000))
+    return Vacancy(
+        id=str(i),
+        name=words(3),
+        alternate_url=f"https://hh.ru/vacancy/{i}",
+        has_test=False,
+        response_letter_required=False,
+        archived=False,
+        employer_id=str(i % 500),
+        employer_name=f"Компания {i % 500}",
+        salary_from=salary_from,
+        salary_to=salary_from and salary_from + 50_000,
+        salary_currency="RUR" if salary_from else None,
+        experience_id=None,
+        area_name=None,
+        published_at=None,
+        requirement=words(25),
+        responsibility=words(25),
+    )
@@ -0,0 +1,180 @@
+"""Burst load test for the bot handler stack.
+
+Feeds synthetic updates through the real Dispatcher and routers with a fake
+Telegram session and a canned hh.ru client, then reports handler latency
+percentiles and SQLite statements per update.
+
+    python -m bench.handlers --users 200 --updates 2000 --concurrency 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import count
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.types import Update
+
+from auth.oauth import OAuthManager
+from bench.fakes import FakeHH, FakeSession
+from bot.dispatcher import build_dispatcher
+from config.settings import Settings
+from storage.fsm import SQLiteFSMStorage
+from storage.sqlite_impl import Filters, SQLiteRepository
+
+BOT_TOKEN = "42:bench"
+
+MESSAGES = {
+    "/filters": "/filters",
+    "/menu": "/menu",
+    "/set_search_text": "/set_search_text python backend",
+    "/set_salary": "/set_salary 150000 250000",
+    "/set_cover_letter": "/set_cover_letter Здравствуйте!",
+    "/set_resume": "/set_resume",
+    "/set_experience": "/set_experience",
+    "/toggle_applying": "/toggle_applying",
+    "/profiles": "/profiles",
+    "/stats": "/stats",
+    "/history": "/history",
+}
+CALLBACKS = ("filters", "menu", "toggle_applying", "profiles", "stats", "history")
+
+
+def _user(uid: int) -> dict[str, Any]:
+    return {"id": uid, "is_bot": False, "first_name": f"user{uid}"}
+
+
+def _message(uid: int, text: str, message_id: int) -> dict[str, Any]:
+    return {
+        "message_id": message_id,
+        "date": int(datetime.now(timezone.utc).timestamp()),
+        "chat": {"id": uid, "type": "private"},
+        "from": _user(uid),
+        "text": text,
+        "entities": (
+            [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+            if text.startswith("/")
+            else []
+        ),
+    }
+
+
+def _update(bot: Bot, update_id: int, uid: int, kind: str) -> Update:
+    if kind in MESSAGES:
+        payload = {
+            "update_id": update_id,
+            "message": _message(uid, MESSAGES[kind], update_id),
+        }
+    else:
+        payload = {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": _user(uid),
+                "chat_instance": str(uid),
+                "data": kind,
+                "message": _message(uid, "menu", update_id),
+            },
+        }
+    return Update.model_validate(payload, context={"bot": bot})
+
+
+def _percentile(samples: list[float], p: float) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(p) - 1]
+
+
+async def run(users: int, updates: int, concurrency: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = Settings(
+            telegram_token=BOT_TOKEN,
+            hh_client_id="bench",
+            hh_client_secret="bench",
+            oauth_redirect_uri="http://localhost/oauth/callback",
+            database_url=tmp,
+        )
+        repo = SQLiteRepository(tmp)
+        await repo.init()
+        for uid in range(1, users + 1):
+            await repo.save_token(uid, "access", "refresh", 3600)
+            await repo.set_filters(
+                uid,
+                Filters(resume_id="r0", search_text="python", frequency=10),
+            )
+
+        statements = 0
+
+        def trace(_: str) -> None:
+            nonlocal statements
+            statements += 1
+
+        repo.set_trace(trace)
+        session = FakeSession()
+        bot = Bot(
+            BOT_TOKEN,
+            session=session,
+            default=DefaultBotProperties(parse_mode="HTML"),
+        )
+        hh = FakeHH()
+        oauth = OAuthManager(settings, repo, bot, hh)  # type: ignore[arg-type]
+        storage = SQLiteFSMStorage(repo)
+        dp = build_dispatcher(repo, hh, bot, oauth, storage)  # type: ignore[arg-type]
+
+        print(
+            f"{'handler':<20}{'updates':>8}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'sql/upd':>9}{'tg/upd':>8}"
+        )
+        ids = count(1)
+        sem = asyncio.Semaphore(concurrency)
+        for kind in (*MESSAGES, *CALLBACKS):
+            batch = [
+                _update(bot, next(ids), 1 + i % users, kind) for i in range(updates)
+            ]
+            latencies: list[float] = []
+
+            async def feed(update: Update) -> None:
+                async with sem:
+                    started = time.perf_counter()
+                    await dp.feed_update(bot, update)
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            await repo.flush()
+            sql_before, tg_before = statements, session.calls
+            await asyncio.gather(*(feed(u) for u in batch))
+            await repo.flush()
+            latencies.sort()
+            print(
+                f"{kind:<20}{len(batch):>8}"
+                f"{_percentile(latencies, 50):>9.2f}"
+                f"{_percentile(latencies, 95):>9.2f}"
+                f"{_percentile(latencies, 99):>9.2f}"
+                f"{(statements - sql_before) / len(batch):>9.2f}"
+                f"{(session.calls - tg_before) / len(batch):>8.2f}"
+            )
+
+        repo.set_trace(None)
+        await storage.close()
+        await repo.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=2000, help="per handler")
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args.users, args.updates, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark BM25 ranking of a cycle's candidates against a resume.
+
+Builds synthetic vacancy snippets and a resume from a shared vocabulary and
+times indexing, scoring and top-K selection. The first round tokenizes every
+vacancy ("cold"); later rounds reuse the cached term arrays the way repeated
+cycles and users searching the same vacancies do.
+
+    python -m bench.ranking --vacancies 3000 --rounds 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from bench.fakes import WORDS, fake_vacancy
+from monitoring.stats import percentiles
+from services.ranking import Ranker, top_k
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vacancies", type=int, default=3000)
+    parser.add_argument("--resume-words", type=int, default=300)
+    parser.add_argument("--top", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vacancies = [fake_vacancy(rng, i) for i in range(args.vacancies)]
+    resume = " ".join(rng.choices(WORDS[:20], k=args.resume_words))
+
+    stages: dict[str, list[float]] = {
+        "cold": [],
+        "index": [],
+        "score": [],
+        "top_k": [],
+        "total": [],
+    }
+    ranker = Ranker()
+    t0 = time.perf_counter()
+    ranker.index(vacancies)
+    stages["cold"].append((time.perf_counter() - t0) * 1000)
+    for _ in range(args.rounds):
+        t0 = time.perf_counter()
+        index = ranker.index(vacancies)
+        t1 = time.perf_counter()
+        scores = index.scores(ranker.terms(resume))
+        t2 = time.perf_counter()
+        top_k(scores, args.top)
+        t3 = time.perf_counter()
+        for name, sec in zip(
+            ("index", "score", "top_k", "total"), (t1 - t0, t2 - t1, t3 - t2, t3 - t0)
+        ):
+            stages[name].append(sec * 1000)
+
+    print(f"{args.vacancies} vacancies, top {args.top}, {args.rounds} rounds")
+    print(f"{'stage':<10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, samples in stages.items():
+        p = percentiles(samples)
+        print(f"{name:<10}{p['p50']:>9.2f}{p['p95']:>9.2f}{p['p99']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
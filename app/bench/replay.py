@@ -0,0 +1,144 @@
+"""Replay a recorded hh.ru cassette through JobProcessor.run_once offline.
+
+Record a cassette in production with HH_CASSETTE_MODE=record, copy it together
+with the data directory it was recorded against, then:
+
+    python -m bench.replay --db ./data --cassette ./data/hh_cassette.jsonl \\
+        --save baseline.json
+    python -m bench.replay --db ./data --cassette ./data/hh_cassette.jsonl \\
+        --baseline baseline.json
+
+With --baseline the run exits non-zero when the cycle makes more hh.ru calls
+or gets slower than the tolerance allows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any
+
+from aiogram import Bot
+
+from auth.oauth import OAuthManager
+from bench.fakes import FakeSession
+from config.settings import Settings
+from hh.cassette import ReplayTransport
+from hh.client import HHClient
+from services.job_processor import JobProcessor
+from storage.sqlite_impl import SQLiteRepository
+
+BOT_TOKEN = "42:replay"
+# timer noise on very short cycles
+CYCLE_NOISE_SEC = 0.05
+
+
+def _copy_db(src_dir: str, dst_dir: str) -> None:
+    src = sqlite3.connect(os.path.join(src_dir, "app.db"))
+    dst = sqlite3.connect(os.path.join(dst_dir, "app.db"))
+    src.backup(dst)
+    # recorded tokens may have expired since, and refreshing them would go online
+    dst.execute("UPDATE token SET expires_at = '9999-12-31T00:00:00+00:00'")
+    dst.commit()
+    src.close()
+    dst.close()
+
+
+async def replay(
+    db_dir: str, cassette: str, latency_scale: float, apply_delay: float
+) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        _copy_db(db_dir, tmp)
+        settings = Settings(
+            telegram_token=BOT_TOKEN,
+            hh_client_id="replay",
+            hh_client_secret="replay",
+            oauth_redirect_uri="http://localhost/oauth/callback",
+            database_url=tmp,
+            hh_cassette_mode="replay",
+            hh_cassette_path=cassette,
+            hh_replay_latency_scale=latency_scale,
+        )
+        repo = SQLiteRepository(tmp)
+        await repo.init()
+        session = FakeSession()
+        bot = Bot(BOT_TOKEN, session=session)
+        hh = HHClient(settings)
+        oauth = OAuthManager(settings, repo, bot, hh)
+        processor = JobProcessor(repo, hh, bot, oauth, apply_delay=apply_delay)
+
+        started = time.perf_counter()
+        await processor.run_once()
+        elapsed = time.perf_counter() - started
+
+        transport = hh.transport
+        assert isinstance(transport, ReplayTransport)
+        report = {
+            "cycle_sec": round(elapsed, 3),
+            "hh_calls": sum(transport.calls.values()),
+            "hh_calls_by_endpoint": dict(transport.calls),
+            "hh_simulated_latency_sec": {
+                k: round(v, 3) for k, v in transport.latency.items()
+            },
+            "not_recorded": dict(transport.misses),
+            "telegram_calls": session.calls,
+        }
+        await hh.aclose()
+        await oauth.aclose()
+        await repo.close()
+        return report
+
+
+def _regressions(
+    report: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    problems = []
+    if report["hh_calls"] > baseline["hh_calls"]:
+        problems.append(
+            f"hh.ru calls grew from {baseline['hh_calls']} to {report['hh_calls']}"
+        )
+    limit = baseline["cycle_sec"] * (1 + tolerance) + CYCLE_NOISE_SEC
+    if report["cycle_sec"] > limit:
+        problems.append(
+            f"cycle time grew from {baseline['cycle_sec']}s to {report['cycle_sec']}s"
+        )
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="data directory with app.db")
+    parser.add_argument("--cassette", required=True)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--apply-delay", type=float, default=0.0)
+    parser.add_argument("--save", help="write the report as JSON")
+    parser.add_argument("--baseline", help="compare against a saved report")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    report = asyncio.run(
+        replay(args.db, args.cassette, args.latency_scale, args.apply_delay)
+    )
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = _regressions(report, json.load(f), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION: {p}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Compare a full processor cycle with and without the runtime speedups.
+
+Seeds a throwaway database with synthetic users, serves fake hh.ru search,
+resume and negotiation endpoints from a local aiohttp server so requests go
+over real sockets, and times JobProcessor.run_once on the default asyncio
+loop with stdlib json, then on uvloop with orjson (whichever of them is
+installed).
+
+    python -m bench.runtime --users 1000 --pages 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import tempfile
+import time
+from typing import Any
+
+import httpx
+from aiogram import Bot
+from aiohttp import web
+
+from bench.fakes import WORDS, FakeSession
+from config.settings import Settings
+from hh import codec
+from hh.client import HHClient
+from runtime import speedups
+from services.job_processor import JobProcessor
+from storage.sqlite_impl import Filters, SQLiteRepository
+
+BOT_TOKEN = "42:bench"
+PER_PAGE = 100
+
+
+def _page(rng: random.Random, query: int, page: int, pages: int) -> bytes:
+    def words(n: int) -> str:
+        return " ".join(rng.choices(WORDS, k=n))
+
+    items = []
+    for i in range(PER_PAGE):
+        vid = f"{query}-{page}-{i}"
+        salary = rng.choice((None, 100_000, 150_000, 200_000))
+        items.append(
+            {
+                "id": vid,
+                "name": words(3),
+                "alternate_url": f"https://hh.ru/vacancy/{vid}",
+                "has_test": False,
+                "response_letter_required": False,
+                "archived": False,
+                "employer": {"id": str(i), "name": f"Компания {i}"},
+                "salary": salary and {"from": salary, "to": None, "currency": "RUR"},
+                "experience": {"id": "between1And3", "name": "От 1 года до 3 лет"},
+                "area": {"id": "1", "name": "Москва"},
+                "published_at": "2024-05-30T12:00:00+0300",
+                "snippet": {
+                    "requirement": f"<highlighttext>{words(1)}</highlighttext> "
+                    + words(25),
+                    "responsibility": words(25),
+                },
+            }
+        )
+    return json.dumps(
+        {"items": items, "found": pages * PER_PAGE, "pages": pages, "page": page},
+        ensure_ascii=False,
+    ).encode()
+
+
+class FakeHHServer:
+    def __init__(self, queries: int, pages: int, seed: int) -> None:
+        rng = random.Random(seed)
+        self._pages = {
+            (q, p): _page(rng, q, p, pages)
+            for q in range(queries)
+            for p in range(pages)
+        }
+        self._resume = json.dumps(
+            {"title": "Python разработчик", "skills": " ".join(WORDS[:20])},
+            ensure_ascii=False,
+        ).encode()
+        self.calls = 0
+        self.port = 0
+        self._runner: web.AppRunner | None = None
+
+    async def _vacancies(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        query = int(request.query["text"].removeprefix("q"))
+        page = int(request.query.get("page", "0"))
+        return web.Response(
+            body=self._pages[query, page], content_type="application/json"
+        )
+
+    async def _resume_view(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        return web.Response(body=self._resume, content_type="application/json")
+
+    async def _apply(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        await request.read()
+        return web.Response(status=201)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.get("/vacancies", self._vacancies),
+                web.get("/resumes/{id}", self._resume_view),
+                web.post("/negotiations", self._apply),
+            ]
+        )
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+# sends the client's https://api.hh.ru requests to the local fake server
+class LocalTransport(httpx.AsyncBaseTransport):
+    def __init__(self, port: int) -> None:
+        self._port = port
+        self._inner = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(
+            scheme="http", host="127.0.0.1", port=self._port
+        )
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+async def cycle(args: argparse.Namespace) -> dict[str, Any]:
+    server = FakeHHServer(min(args.users, args.queries), args.pages, args.seed)
+    await server.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = Settings(
+            telegram_token=BOT_TOKEN,
+            hh_client_id="bench",
+            hh_client_secret="bench",
+            oauth_redirect_uri="http://localhost/oauth/callback",
+            database_url=tmp,
+        )
+        repo = SQLiteRepository(tmp)
+        await repo.init()
+        for uid in range(1, args.users + 1):
+            await repo.save_token(uid, "access", "refresh", 24 * 3600)
+            await repo.set_filters(
+                uid,
+                Filters(
+                    is_applying=True,
+                    resume_id=f"r{uid}",
+                    search_text=f"q{uid % args.queries}",
+                    frequency=args.applies,
+                ),
+            )
+        await repo.flush()
+
+        hh = HHClient(settings)
+        hh.transport = LocalTransport(server.port)
+        bot = Bot(BOT_TOKEN, session=FakeSession())
+        processor = JobProcessor(
+            repo,
+            hh,
+            bot,
+            None,  # type: ignore[arg-type]
+            apply_delay=0,
+            apply_concurrency=args.concurrency,
+            search_concurrency=args.concurrency,
+        )
+        started = time.perf_counter()
+        await processor.run_once()
+        elapsed = time.perf_counter() - started
+        await hh.aclose()
+        await repo.close()
+    await server.stop()
+    return {"cycle_sec": round(elapsed, 3), "hh_calls": server.calls}
+
+
+def _measure(args: argparse.Namespace, enabled: bool) -> dict[str, Any]:
+    runtime = speedups.install(enabled)
+    orjson = codec.orjson
+    if runtime.json != "orjson":
+        # the hh client decodes with orjson whenever it is importable
+        codec.orjson = None
+    try:
+        report = speedups.run(cycle(args), runtime)
+    finally:
+        codec.orjson = orjson
+    return {"loop": runtime.loop, "json": runtime.json, **report}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument(
+        "--queries", type=int, default=1000, help="distinct search texts"
+    )
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--applies", type=int, default=5, help="quota per user")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    baseline = _measure(args, enabled=False)
+    fast = _measure(args, enabled=True)
+    print(json.dumps({"baseline": baseline, "speedups": fast}, indent=2))
+    if fast["cycle_sec"]:
+        print(f"speedup: {baseline['cycle_sec'] / fast['cycle_sec']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
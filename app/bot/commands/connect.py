@@ -7,7 +7,7 @@ def build_router(oauth: OAuthManager) -> Router:
 
     @router.message(F.text.casefold() == "/connect")
     async def connect(message: types.Message):
-        url = oauth.build_authorize_url(message.from_user.id)
+        url = await oauth.build_authorize_url(message.from_user.id)
         kb = types.InlineKeyboardMarkup(
                 inline_keyboard=[
                     [types.InlineKeyboardButton(text="Авторизоваться в HH.ru", url=url)]
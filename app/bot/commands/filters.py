@@ -4,6 +4,7 @@ from aiogram.filters import Command, CommandObject
 
 from bot.middlewares.auth import AuthMessageMiddleware
 from hh.client import HHClient
+from services.cover_letter import TemplateError, compile_template
 from storage.sqlite_impl import SQLiteRepository, Filters
 
 router = Router()
@@ -150,6 +151,11 @@ def setup(repo: SQLiteRepository, hh_client: HHClient) -> Router:
         if not command.args:
             await msg.answer("Формат: /set_cover_letter Текст сопроводительного письма")
             return
+        try:
+            compile_template(command.args)
+        except TemplateError as e:
+            await msg.answer(str(e))
+            return
         f = await repo.get_filters(msg.from_user.id)
         if not f:
             f = Filters()
@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+from html import escape
+from typing import Optional
+
+from aiogram import F, Router, types
+from aiogram.filters import Command
+
+from bot.middlewares.auth import AuthCallbackMiddleware, AuthMessageMiddleware
+from hh.client import HHClient
+from storage.sqlite_impl import AppliedVacancy, HistoryCursor, SQLiteRepository
+
+router = Router()
+
+HISTORY_PAGE_SIZE = 10
+
+
+def _cursor_data(direction: str, a: AppliedVacancy) -> str:
+    # repr keeps the float exact, so the next page starts right after this row
+    return f"history:{direction}:{a.applied_at!r}:{a.vacancy_id}"
+
+
+def _parse_cursor(data: str) -> tuple[str, HistoryCursor]:
+    _, direction, applied_at, vacancy_id = data.split(":", 3)
+    return direction, (float(applied_at), vacancy_id)
+
+
+def _format_row(a: AppliedVacancy) -> str:
+    name = escape(a.name or f"Вакансия {a.vacancy_id}")
+    url = escape(a.url or f"https://hh.ru/vacancy/{a.vacancy_id}")
+    day = (
+        datetime.fromtimestamp(a.applied_at, timezone.utc).strftime("%d.%m.%Y")
+        if a.applied_at
+        else "дата неизвестна"
+    )
+    return f'<code>{day}</code> <a href="{url}">{name}</a>'
+
+
+async def _history_page(
+    repo: SQLiteRepository, tg_id: int, data: Optional[str] = None
+) -> tuple[str, types.InlineKeyboardMarkup]:
+    before = after = None
+    if data is not None:
+        direction, cursor = _parse_cursor(data)
+        if direction == "next":
+            before = cursor
+        else:
+            after = cursor
+    rows, more = await repo.applied_history(
+        tg_id, before=before, after=after, limit=HISTORY_PAGE_SIZE
+    )
+
+    nav: list[types.InlineKeyboardButton] = []
+    if rows:
+        has_newer = more if after is not None else before is not None
+        has_older = more if after is None else True
+        if has_newer:
+            nav.append(
+                types.InlineKeyboardButton(
+                    text="⬅️ Новее", callback_data=_cursor_data("prev", rows[0])
+                )
+            )
+        if has_older:
+            nav.append(
+                types.InlineKeyboardButton(
+                    text="Старее ➡️", callback_data=_cursor_data("next", rows[-1])
+                )
+            )
+    kb = types.InlineKeyboardMarkup(
+        inline_keyboard=[
+            *([nav] if nav else []),
+            [types.InlineKeyboardButton(text="Меню📋", callback_data="menu")],
+        ]
+    )
+
+    if not rows:
+        return "Откликов пока нет.", kb
+    text = "📜 История откликов:\n\n" + "\n".join(_format_row(a) for a in rows)
+    return text, kb
+
+
+def setup(repo: SQLiteRepository, hh_client: HHClient) -> Router:
+    router.message.middleware(AuthMessageMiddleware(repo, hh_client))
+    router.callback_query.middleware(AuthCallbackMiddleware(repo, hh_client))
+
+    @router.message(Command("history"))
+    async def cmd_history(msg: types.Message) -> None:
+        text, kb = await _history_page(repo, msg.from_user.id)
+        await msg.answer(text, reply_markup=kb, disable_web_page_preview=True)
+
+    @router.callback_query(F.data == "history")
+    async def show_history(q: types.CallbackQuery) -> None:
+        text, kb = await _history_page(repo, q.from_user.id)
+        await q.message.answer(text, reply_markup=kb, disable_web_page_preview=True)
+        await q.answer()
+
+    @router.callback_query(F.data.startswith("history:"))
+    async def page_history(q: types.CallbackQuery) -> None:
+        text, kb = await _history_page(repo, q.from_user.id, q.data)
+        await q.message.edit_text(text, reply_markup=kb, disable_web_page_preview=True)
+        await q.answer()
+
+    return router
@@ -31,6 +31,14 @@ def setup(repo: SQLiteRepository, hh_client: HHClient) -> Router:
                         callback_data="toggle_applying",
                     ),
                 ],
+                [
+                    types.InlineKeyboardButton(
+                        text="Статистика📊", callback_data="stats"
+                    ),
+                    types.InlineKeyboardButton(
+                        text="История📜", callback_data="history"
+                    ),
+                ],
             ]
         )
         await msg.answer(message, reply_markup=menu_kb)
@@ -0,0 +1,253 @@
+from html import escape
+
+from aiogram import F, Router, types
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+
+from bot.middlewares.auth import AuthCallbackMiddleware, AuthMessageMiddleware
+from hh.client import HHClient
+from services.cover_letter import PLACEHOLDERS_HELP, TemplateError, compile_template
+from storage.sqlite_impl import SearchProfile, SQLiteRepository
+
+router = Router()
+
+
+class ProfileCoverLetterState(StatesGroup):
+    COVER_LETTER = State()
+
+
+def _format_profile(p: SearchProfile) -> str:
+    parts = [
+        f"🗂 <b>{escape(p.name)}</b>",
+        f"🔑 Текст поиска: <code>{escape(p.search_text)}</code>",
+        (
+            f"📄 Резюме-ID: <code>{p.resume_id}</code>"
+            if p.resume_id
+            else "📄 Резюме: как в основных фильтрах"
+        ),
+        (
+            "📝 Своё сопроводительное письмо"
+            if p.cover_letter
+            else "📝 Письмо: как в основных фильтрах"
+        ),
+    ]
+    return "\n".join(parts)
+
+
+def _back_kb(callback_data: str = "profiles") -> types.InlineKeyboardMarkup:
+    return types.InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                types.InlineKeyboardButton(
+                    text="Профили поиска🗂", callback_data=callback_data
+                ),
+                types.InlineKeyboardButton(text="Меню📋", callback_data="menu"),
+            ],
+        ]
+    )
+
+
+def setup(repo: SQLiteRepository, hh_client: HHClient, max_profiles: int = 5) -> Router:
+    router.message.middleware(AuthMessageMiddleware(repo, hh_client))
+    router.callback_query.middleware(AuthCallbackMiddleware(repo, hh_client))
+
+    async def _profiles_view(
+        tg_id: int,
+    ) -> tuple[str, types.InlineKeyboardMarkup]:
+        profiles = await repo.list_profiles(tg_id)
+        if profiles:
+            message = "Дополнительные профили поиска:"
+        else:
+            message = "Дополнительных профилей поиска нет."
+        message += (
+            "\n\nВакансии по всем профилям ищутся вместе с основными фильтрами.\n"
+            "Добавить профиль: /add_profile Название | текст поиска"
+        )
+        kb = types.InlineKeyboardMarkup(
+            inline_keyboard=[
+                *(
+                    [
+                        types.InlineKeyboardButton(
+                            text=p.name, callback_data=f"profile:{p.id}"
+                        )
+                    ]
+                    for p in profiles
+                ),
+                [
+                    types.InlineKeyboardButton(
+                        text="Фильтры поиска⚙️", callback_data="filters"
+                    ),
+                    types.InlineKeyboardButton(text="Меню📋", callback_data="menu"),
+                ],
+            ]
+        )
+        return message, kb
+
+    # /profiles  → список профилей
+    @router.message(Command("profiles"))
+    async def cmd_profiles(msg: types.Message) -> None:
+        message, kb = await _profiles_view(msg.from_user.id)
+        await msg.answer(message, reply_markup=kb)
+
+    # /add_profile Бэкенд | python backend
+    @router.message(Command("add_profile"))
+    async def cmd_add_profile(msg: types.Message, command: CommandObject) -> None:
+        name, sep, search_text = (command.args or "").partition("|")
+        name, search_text = name.strip(), search_text.strip()
+        if not sep or not name or not search_text:
+            await msg.answer(
+                "Формат: /add_profile Бэкенд | python backend\nПодробнее: https://hh.ru/article/1175"
+            )
+            return
+        if len(await repo.list_profiles(msg.from_user.id)) >= max_profiles:
+            await msg.answer(
+                f"Можно сохранить не больше {max_profiles} профилей поиска",
+                reply_markup=_back_kb(),
+            )
+            return
+        profile_id = await repo.add_profile(msg.from_user.id, name[:64], search_text)
+        await msg.answer(
+            "Профиль поиска добавлен", reply_markup=_back_kb(f"profile:{profile_id}")
+        )
+
+    @router.callback_query(F.data == "profiles")
+    async def show_profiles(q: types.CallbackQuery, state: FSMContext) -> None:
+        await state.clear()
+        message, kb = await _profiles_view(q.from_user.id)
+        await q.message.answer(message, reply_markup=kb)
+        await q.answer()
+
+    @router.callback_query(F.data.startswith("profile:"))
+    async def show_profile(q: types.CallbackQuery, state: FSMContext) -> None:
+        await state.clear()
+        p = await repo.get_profile(q.from_user.id, int(q.data.split(":")[1]))
+        if p is None:
+            await q.answer("Профиль не найден")
+            return
+        profile_kb = types.InlineKeyboardMarkup(
+            inline_keyboard=[
+                [
+                    types.InlineKeyboardButton(
+                        text="Резюме📄", callback_data=f"profile_resume:{p.id}"
+                    ),
+                    types.InlineKeyboardButton(
+                        text="Сопровод-ное письмо📝",
+                        callback_data=f"profile_letter:{p.id}",
+                    ),
+                ],
+                [
+                    types.InlineKeyboardButton(
+                        text="Удалить🗑", callback_data=f"profile_del:{p.id}"
+                    ),
+                    types.InlineKeyboardButton(
+                        text="Профили поиска🗂", callback_data="profiles"
+                    ),
+                ],
+            ]
+        )
+        await q.message.answer(_format_profile(p), reply_markup=profile_kb)
+        await q.answer()
+
+    @router.callback_query(F.data.startswith("profile_resume:"))
+    async def ask_profile_resume(q: types.CallbackQuery) -> None:
+        profile_id = int(q.data.split(":")[1])
+        access_token = await repo.get_token(q.from_user.id)
+        resumes = await hh_client.list_resumes(access_token.access_token)
+        resume_kb = types.InlineKeyboardMarkup(
+            inline_keyboard=[
+                *(
+                    [
+                        types.InlineKeyboardButton(
+                            text=resume["title"],
+                            callback_data=f"presume:{profile_id}:{resume['id']}",
+                        )
+                    ]
+                    for resume in resumes
+                ),
+                [
+                    types.InlineKeyboardButton(
+                        text="Как в основных фильтрах",
+                        callback_data=f"presume:{profile_id}:0",
+                    ),
+                ],
+                [
+                    types.InlineKeyboardButton(
+                        text="Отмена❌", callback_data=f"profile:{profile_id}"
+                    ),
+                ],
+            ]
+        )
+        await q.message.answer("Выбери резюме для профиля:", reply_markup=resume_kb)
+        await q.answer()
+
+    @router.callback_query(F.data.startswith("presume:"))
+    async def set_profile_resume(q: types.CallbackQuery) -> None:
+        _, profile_id, resume = q.data.split(":")
+        p = await repo.get_profile(q.from_user.id, int(profile_id))
+        if p is None:
+            await q.answer("Профиль не найден")
+            return
+        p.resume_id = None if resume == "0" else resume
+        await repo.update_profile(p)
+        await q.message.answer(
+            "Резюме профиля успешно изменено", reply_markup=_back_kb(f"profile:{p.id}")
+        )
+        await q.answer()
+
+    @router.callback_query(F.data.startswith("profile_letter:"))
+    async def ask_profile_letter(q: types.CallbackQuery, state: FSMContext) -> None:
+        p = await repo.get_profile(q.from_user.id, int(q.data.split(":")[1]))
+        if p is None:
+            await q.answer("Профиль не найден")
+            return
+        await state.clear()
+        await state.set_state(ProfileCoverLetterState.COVER_LETTER)
+        await state.update_data(profile_id=p.id)
+
+        if p.cover_letter:
+            message = f"Текущее сопроводительное письмо:\n\n{p.cover_letter}"
+        else:
+            message = "Текущее сопроводительное письмо: как в основных фильтрах"
+        message += "\n\n" + PLACEHOLDERS_HELP
+        message += "\n\nВведи новое сопроводительное письмо или «-», чтобы использовать основное:"
+
+        letter_kb = types.InlineKeyboardMarkup(
+            inline_keyboard=[
+                [
+                    types.InlineKeyboardButton(
+                        text="Отмена❌", callback_data=f"profile:{p.id}"
+                    ),
+                ],
+            ]
+        )
+        await q.message.answer(message, reply_markup=letter_kb)
+        await q.answer()
+
+    @router.message(ProfileCoverLetterState.COVER_LETTER)
+    async def set_profile_letter(msg: types.Message, state: FSMContext) -> None:
+        try:
+            compile_template(msg.text or "")
+        except TemplateError as e:
+            await msg.answer(str(e))
+            return
+        data = await state.get_data()
+        await state.clear()
+        p = await repo.get_profile(msg.from_user.id, data.get("profile_id", 0))
+        if p is None:
+            await msg.answer("Профиль не найден", reply_markup=_back_kb())
+            return
+        p.cover_letter = None if (msg.text or "").strip() == "-" else msg.text
+        await repo.update_profile(p)
+        await msg.answer(
+            "Сопроводительное письмо профиля успешно изменено",
+            reply_markup=_back_kb(f"profile:{p.id}"),
+        )
+
+    @router.callback_query(F.data.startswith("profile_del:"))
+    async def delete_profile(q: types.CallbackQuery, state: FSMContext) -> None:
+        await repo.delete_profile(q.from_user.id, int(q.data.split(":")[1]))
+        await q.message.answer("Профиль поиска удалён", reply_markup=_back_kb())
+        await q.answer()
+
+    return router
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+from aiogram import F, Router, types
+from aiogram.filters import Command
+
+from bot.middlewares.auth import AuthCallbackMiddleware, AuthMessageMiddleware
+from hh.client import HHClient
+from storage.sqlite_impl import SQLiteRepository, quota_day
+
+router = Router()
+
+STATS_DAYS = 7
+
+
+def _since(days: int) -> str:
+    return quota_day(datetime.now(timezone.utc) - timedelta(days=days - 1))
+
+
+async def _format_stats(repo: SQLiteRepository, tg_id: int) -> str:
+    since = _since(STATS_DAYS)
+    days = await repo.user_stats(tg_id, since)
+    if not days:
+        return f"За последние {STATS_DAYS} дней откликов не было."
+
+    parts = [f"📊 Статистика за {STATS_DAYS} дней:\n"]
+    for d in days:
+        parts.append(
+            f"<code>{d.day}</code>: откликов {d.applied}, ошибок {d.failed}, "
+            f"найдено {d.seen}, подходящих {d.eligible}"
+        )
+    parts.append(
+        f"\nВсего откликов: {sum(d.applied for d in days)}"
+        f"\nУже были отклики через сайт: {sum(d.already_applied for d in days)}"
+    )
+    failures = await repo.user_failures(tg_id, since)
+    if failures:
+        parts.append("\nПричины ошибок:")
+        parts.extend(f"• <code>{reason}</code>: {count}" for reason, count in failures)
+    return "\n".join(parts)
+
+
+def setup(repo: SQLiteRepository, hh_client: HHClient) -> Router:
+    router.message.middleware(AuthMessageMiddleware(repo, hh_client))
+    router.callback_query.middleware(AuthCallbackMiddleware(repo, hh_client))
+
+    stats_kb = types.InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                types.InlineKeyboardButton(text="Меню📋", callback_data="menu"),
+            ],
+        ]
+    )
+
+    @router.message(Command("stats"))
+    async def cmd_stats(msg: types.Message) -> None:
+        await msg.answer(
+            await _format_stats(repo, msg.from_user.id), reply_markup=stats_kb
+        )
+
+    @router.callback_query(F.data == "stats")
+    async def show_stats(q: types.CallbackQuery) -> None:
+        await q.message.answer(
+            await _format_stats(repo, q.from_user.id), reply_markup=stats_kb
+        )
+        await q.answer()
+
+    return router
@@ -0,0 +1,32 @@
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+
+from auth.oauth import OAuthManager
+from bot.commands import filters as filters_cmds
+from bot.commands import history
+from bot.commands import menu
+from bot.commands import profiles
+from bot.commands import stats
+from bot.commands.connect import build_router
+from bot.handlers import menu as menu_handlers
+from hh.client import HHClient
+from storage.sqlite_impl import SQLiteRepository
+
+
+def build_dispatcher(
+    repo: SQLiteRepository,
+    hh_client: HHClient,
+    bot: Bot,
+    oauth: OAuthManager,
+    storage: BaseStorage,
+    max_profiles: int = 5,
+) -> Dispatcher:
+    dp = Dispatcher(storage=storage)
+    dp.include_router(build_router(oauth))
+    dp.include_router(filters_cmds.setup(repo, hh_client))
+    dp.include_router(menu.setup(repo, hh_client))
+    dp.include_router(profiles.setup(repo, hh_client, max_profiles))
+    dp.include_router(stats.setup(repo, hh_client))
+    dp.include_router(history.setup(repo, hh_client))
+    dp.include_router(menu_handlers.setup(repo, hh_client, bot))
+    return dp
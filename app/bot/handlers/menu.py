@@ -4,6 +4,7 @@ from aiogram.fsm.state import StatesGroup, State
 
 from bot.middlewares.auth import AuthCallbackMiddleware
 from hh.client import HHClient
+from services.cover_letter import PLACEHOLDERS_HELP, TemplateError, compile_template
 from storage.sqlite_impl import SQLiteRepository
 
 router = Router()
@@ -53,6 +54,14 @@ def setup(repo: SQLiteRepository, hh_client: HHClient, bot: Bot) -> Router:
                         callback_data="toggle_applying",
                     ),
                 ],
+                [
+                    types.InlineKeyboardButton(
+                        text="Статистика📊", callback_data="stats"
+                    ),
+                    types.InlineKeyboardButton(
+                        text="История📜", callback_data="history"
+                    ),
+                ],
             ]
         )
         await q.message.answer(message, reply_markup=menu_kb)
@@ -85,6 +94,9 @@ def setup(repo: SQLiteRepository, hh_client: HHClient, bot: Bot) -> Router:
                     ),
                 ],
                 [
+                    types.InlineKeyboardButton(
+                        text="Профили поиска🗂", callback_data="profiles"
+                    ),
                     types.InlineKeyboardButton(text="Меню📋", callback_data="menu"),
                 ],
             ]
@@ -159,6 +171,7 @@ def setup(repo: SQLiteRepository, hh_client: HHClient, bot: Bot) -> Router:
         else:
             message = "Текущее сопроводительное письмо: нет"
 
+        message += "\n\n" + PLACEHOLDERS_HELP
         message += "\n\nВведи сопроводительное письмо:"
 
         await q.message.answer(message, reply_markup=cover_letter_kb)
@@ -166,6 +179,11 @@ def setup(repo: SQLiteRepository, hh_client: HHClient, bot: Bot) -> Router:
 
     @router.message(CoverLetterState.COVER_LETTER)
     async def set_cover_letter(msg: types.Message, state: FSMContext) -> None:
+        try:
+            compile_template(msg.text or "")
+        except TemplateError as e:
+            await msg.answer(str(e))
+            return
         filters = await repo.get_filters(msg.from_user.id)
         filters["cover_letter"] = msg.text
         await repo.set_filters(msg.from_user.id, filters)
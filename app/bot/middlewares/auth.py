@@ -16,7 +16,6 @@ class AuthMessageMiddleware(BaseMiddleware):
         event: Message | TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        print("testing")
         if not await self.repo.get_token(event.from_user.id):
             await event.answer("Пожалуйста, авторизуйтесь в HH.ru с помощью /connect")
             return
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 from pydantic import AnyUrl, SecretStr
 
@@ -10,6 +12,52 @@ class Settings(BaseSettings):
     database_url: str = "sqlite:///./data.db"
     user_agent: str = "headhunter-xorbot/1.0"
     poll_interval_minutes: int = 10
+    hh_max_retries: int = 4
+    hh_backoff_base_sec: float = 0.5
+    hh_backoff_max_sec: float = 30.0
+    hh_retry_after_max_sec: float = 120.0
+    hh_breaker_threshold: int = 5
+    hh_breaker_cooldown_sec: float = 60.0
+    hh_debug_capture: bool = False
+    hh_cassette_mode: Literal["off", "record", "replay"] = "off"
+    hh_cassette_path: str = "./data/hh_cassette.jsonl"
+    hh_replay_latency_scale: float = 1.0
+    hh_vacancy_cache_size: int = 5000
+    hh_vacancy_cache_ttl_sec: int = 6 * 3600
+    hh_vacancy_cache_path: Optional[str] = None
+    db_flush_interval_ms: int = 50
+    db_flush_batch_size: int = 256
+    fsm_state_ttl_hours: int = 24
+    fsm_cache_ttl_sec: float = 5.0
+    apply_delay_sec: float = 2.0
+    apply_concurrency: int = 1
+    pipeline_token_concurrency: int = 4
+    pipeline_search_concurrency: int = 2
+    pipeline_filter_concurrency: int = 4
+    pipeline_notify_concurrency: int = 2
+    pipeline_queue_size: int = 100
+    max_search_profiles: int = 5
+    ranking_pool_size: int = 300
+    ranking_pool_factor: int = 3
+    negotiation_sync_interval_minutes: int = 30
+    oauth_state_ttl_sec: int = 600
+    auth_quarantine_base_sec: int = 600
+    auth_quarantine_max_sec: int = 86400
+    admin_token: Optional[SecretStr] = None
+    health_max_scheduler_lag_sec: int = 300
+    health_max_loop_lag_sec: float = 5.0
+    runtime_speedups: bool = False
+    watchdog_threshold_ms: int = 100
+    watchdog_interval_ms: int = 50
+    db_backup_dir: Optional[str] = None
+    db_backup_keep: int = 7
+    db_backup_interval_hours: float = 24
+    db_backup_pages_per_step: int = 256
+    db_maintenance_interval_hours: float = 6
+    db_maintenance_min_quiet_sec: int = 120
+    shutdown_timeout_sec: float = 20.0
+    warm_state_path: Optional[str] = None
+    warm_state_max_age_hours: float = 6
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, Optional
+
+import httpx
+
+REDACTED = "<redacted>"
+SECRET_KEYS = frozenset({"access_token", "refresh_token", "code", "client_secret"})
+KEPT_HEADERS = ("content-type", "retry-after")
+
+
+def request_key(request: httpx.Request) -> str:
+    query = sorted(
+        (k, REDACTED if k in SECRET_KEYS else v)
+        for k, v in request.url.params.multi_items()
+    )
+    return f"{request.method} {request.url.path}?{httpx.QueryParams(query)}"
+
+
+def endpoint_of(key: str) -> str:
+    return key.split("?", 1)[0]
+
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if k in SECRET_KEYS else _redact(v) for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def _redact_body(content: bytes) -> str:
+    text = content.decode("utf-8", errors="replace")
+    try:
+        return json.dumps(_redact(json.loads(text)), ensure_ascii=False)
+    except ValueError:
+        return text
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(
+        self, path: str, inner: Optional[httpx.AsyncBaseTransport] = None
+    ) -> None:
+        self._inner = inner or httpx.AsyncHTTPTransport()
+        self._file = open(path, "a", encoding="utf-8")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        resp = await self._inner.handle_async_request(request)
+        content = await resp.aread()
+        entry = {
+            "key": request_key(request),
+            "status": resp.status_code,
+            "headers": {h: resp.headers[h] for h in KEPT_HEADERS if h in resp.headers},
+            "content": _redact_body(content),
+            "elapsed": round(time.perf_counter() - started, 4),
+        }
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        return resp
+
+    async def aclose(self) -> None:
+        self._file.close()
+        await self._inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, path: str, latency_scale: float = 1.0) -> None:
+        self._latency_scale = latency_scale
+        self._entries: defaultdict[str, deque[dict[str, Any]]] = defaultdict(deque)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+        self.calls: Counter[str] = Counter()
+        self.latency: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        endpoint = endpoint_of(key)
+        self.calls[endpoint] += 1
+        recorded = self._entries.get(key)
+        if not recorded:
+            self.misses[endpoint] += 1
+            return httpx.Response(
+                404, json={"errors": [{"type": "not_recorded"}]}, request=request
+            )
+        # replay in recorded order, keep serving the last answer once exhausted
+        entry = recorded.popleft() if len(recorded) > 1 else recorded[0]
+        delay = entry["elapsed"] * self._latency_scale
+        self.latency[endpoint] += delay
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=entry["content"].encode("utf-8"),
+            request=request,
+        )
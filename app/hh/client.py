@@ -1,23 +1,180 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import time
+from datetime import datetime
+
 import httpx
-from typing import Any
+from typing import Any, AsyncIterator, Optional
 
 from config.settings import Settings
-from storage.sqlite_impl import Filters
+from hh import codec
+from hh.cassette import RecordingTransport, ReplayTransport
+from hh.detail_cache import VacancyDetailCache
+from hh.models import Vacancy, VacancyDetail
+from hh.resilience import (
+    RETRY_STATUSES,
+    SAFE_RETRY_STATUSES,
+    CircuitBreaker,
+    CircuitOpenError,
+    backoff_delay,
+    retry_after,
+)
+from storage.sqlite_impl import AppliedVacancy, Filters
+
+logger = logging.getLogger(__name__)
+
+DICTIONARIES_TTL = 24 * 3600
+RESUME_TEXT_TTL = 6 * 3600
+
+# search pages shared between users and profiles within one cycle
+PageCache = dict[tuple[tuple[str, str], ...], tuple[list[Vacancy], int]]
 
 
 class HHClient:
-    __slots__ = ("_settings", "_base", "_ua")
+    __slots__ = (
+        "_settings",
+        "_base",
+        "_ua",
+        "_client",
+        "_breakers",
+        "_dictionaries",
+        "_dictionaries_at",
+        "_resume_texts",
+        "_details",
+        "transport",
+    )
 
     def __init__(self, settings: Settings) -> None:
         self._settings = settings
         self._base: str = "https://api.hh.ru"
         self._ua: dict[str, str] = {"User-Agent": settings.user_agent}
+        self._client: httpx.AsyncClient | None = None
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._dictionaries: dict[str, Any] | None = None
+        self._dictionaries_at = 0.0
+        self._resume_texts: dict[str, tuple[float, str]] = {}
+        self._details = VacancyDetailCache(
+            self._fetch_vacancy,
+            max_size=settings.hh_vacancy_cache_size,
+            ttl=settings.hh_vacancy_cache_ttl_sec,
+            db_path=settings.hh_vacancy_cache_path,
+        )
+        self.transport: httpx.AsyncBaseTransport | None = None
+        if settings.hh_cassette_mode == "record":
+            self.transport = RecordingTransport(settings.hh_cassette_path)
+        elif settings.hh_cassette_mode == "replay":
+            self.transport = ReplayTransport(
+                settings.hh_cassette_path, settings.hh_replay_latency_scale
+            )
+
+    @property
+    def is_warm(self) -> bool:
+        return self._client is not None and self._dictionaries is not None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=30, transport=self.transport)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(
+                endpoint,
+                self._settings.hh_breaker_threshold,
+                self._settings.hh_breaker_cooldown_sec,
+            )
+        return breaker
+
+    async def _request(
+        self,
+        endpoint: str,
+        method: str,
+        path: str,
+        /,
+        idempotent: bool = True,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        s = self._settings
+        breaker = self._breaker(endpoint)
+        retry_statuses = RETRY_STATUSES if idempotent else SAFE_RETRY_STATUSES
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                resp = await self._http().request(
+                    method, f"{self._base}{path}", **kwargs
+                )
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                retriable = idempotent or isinstance(
+                    e, (httpx.ConnectError, httpx.ConnectTimeout)
+                )
+                if not retriable or attempt >= s.hh_max_retries:
+                    raise
+                delay = backoff_delay(
+                    attempt, s.hh_backoff_base_sec, s.hh_backoff_max_sec
+                )
+                logger.warning(
+                    "hh %s %s failed (%r), retry in %.1fs", method, path, e, delay
+                )
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    resp.raise_for_status()
+                    return resp
+                breaker.record_failure()
+                if (
+                    resp.status_code not in retry_statuses
+                    or attempt >= s.hh_max_retries
+                ):
+                    resp.raise_for_status()
+                delay = backoff_delay(
+                    attempt, s.hh_backoff_base_sec, s.hh_backoff_max_sec
+                )
+                wait = retry_after(resp)
+                if wait is not None:
+                    if wait > s.hh_retry_after_max_sec:
+                        resp.raise_for_status()
+                    delay = max(delay, wait)
+                logger.warning(
+                    "hh %s %s returned %s, retry in %.1fs",
+                    method,
+                    path,
+                    resp.status_code,
+                    delay,
+                )
+            finally:
+                breaker.release_probe()
+            attempt += 1
+            await asyncio.sleep(delay)
 
     async def search_vacancies(
         self, access_token: str, f: Filters, /, page: int = 0, per_page: int = 100
-    ) -> list[dict[str, Any]]:
+    ) -> list[Vacancy]:
+        return [
+            v
+            async for v in self.iter_vacancies(
+                access_token, f, page=page, per_page=per_page
+            )
+        ]
+
+    async def iter_vacancies(
+        self,
+        access_token: str,
+        f: Filters,
+        /,
+        page: int = 0,
+        per_page: int = 100,
+        page_cache: Optional[PageCache] = None,
+    ) -> AsyncIterator[Vacancy]:
         params: dict[str, Any] = {
             "page": page,
             "per_page": per_page,
@@ -32,24 +189,39 @@ class HHClient:
             params.update({"salary": f["min_salary"], "currency": "RUR"})
 
         headers = {**self._ua, "Authorization": f"Bearer {access_token}"}
-        result = []
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{self._base}/vacancies", params=params, headers=headers
-            )
-            resp.raise_for_status()
-            pages = resp.json()["pages"]
-            result.extend(resp.json()["items"])
-            for i in range(1, pages):
-                params["page"] = i
-                resp = await client.get(
-                    f"{self._base}/vacancies",
-                    params=params,
-                    headers=headers,
-                )
-                resp.raise_for_status()
-                result.extend(resp.json()["items"])
-            return result
+        first, pages = page, page + 1
+        while page < pages:
+            params["page"] = page
+            key = tuple(sorted((k, str(v)) for k, v in params.items()))
+            cached = page_cache.get(key) if page_cache is not None else None
+            if cached is not None:
+                batch, pages = cached
+            else:
+                try:
+                    resp = await self._request(
+                        "vacancies", "GET", "/vacancies", params=params, headers=headers
+                    )
+                except (httpx.HTTPError, CircuitOpenError) as e:
+                    if page == first:
+                        raise
+                    # keep what we already have, the rest is picked up next cycle
+                    logger.warning(
+                        "vacancy search stopped at page %d/%d: %r", page, pages, e
+                    )
+                    return
+                batch = []
+                pages = self._decode_page(resp, batch)
+                if page_cache is not None:
+                    page_cache[key] = (batch, pages)
+            for v in batch:
+                yield v
+            page += 1
+
+    def _decode_page(self, resp: httpx.Response, out: list[Vacancy]) -> int:
+        keep_raw = self._settings.hh_debug_capture
+        body = codec.loads(resp.content)
+        out.extend(Vacancy.from_json(item, keep_raw) for item in body["items"])
+        return body["pages"]
 
     async def apply(
         self,
@@ -69,29 +241,122 @@ class HHClient:
             "resume_id": (None, resume_id),
         }
 
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{self._base}/negotiations",
-                files=payload,
-                headers=headers,
-                timeout=30,
+        await self._request(
+            "negotiations",
+            "POST",
+            "/negotiations",
+            idempotent=False,
+            files=payload,
+            headers=headers,
+        )
+
+    async def iter_negotiations(
+        self, access_token: str, /, per_page: int = 100
+    ) -> AsyncIterator[AppliedVacancy]:
+        headers = {**self._ua, "Authorization": f"Bearer {access_token}"}
+        params: dict[str, Any] = {
+            "per_page": per_page,
+            "order_by": "created_at",
+            "order": "desc",
+        }
+        page, pages = 0, 1
+        while page < pages:
+            params["page"] = page
+            resp = await self._request(
+                "negotiations", "GET", "/negotiations", params=params, headers=headers
             )
+            data = codec.loads(resp.content)
+            pages = data.get("pages", 0)
+            for item in data.get("items", []):
+                vacancy = item.get("vacancy")
+                if vacancy and item.get("created_at"):
+                    yield AppliedVacancy(
+                        vacancy["id"],
+                        vacancy.get("name"),
+                        vacancy.get("alternate_url"),
+                        datetime.fromisoformat(item["created_at"]).timestamp(),
+                    )
+            page += 1
+
+    async def get_vacancy(self, vacancy_id: str) -> VacancyDetail:
+        return await self._details.get(vacancy_id)
 
-            resp.raise_for_status()
+    async def _fetch_vacancy(self, vacancy_id: str) -> VacancyDetail:
+        # public endpoint; without a token the answer is the same for everyone
+        resp = await self._request(
+            "vacancy", "GET", f"/vacancies/{vacancy_id}", headers=self._ua
+        )
+        return VacancyDetail.from_json(codec.loads(resp.content))
+
+    def vacancy_cache_stats(self) -> dict[str, Any]:
+        return self._details.stats()
 
     async def list_resumes(self, access_token: str) -> list[dict[str, Any]]:
         headers = {**self._ua, "Authorization": f"Bearer {access_token}"}
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{self._base}/resumes/mine", headers=headers, timeout=30
+        resp = await self._request("resumes", "GET", "/resumes/mine", headers=headers)
+        return resp.json()["items"]
+
+    async def get_resume_text(self, access_token: str, resume_id: str) -> str:
+        cached = self._resume_texts.get(resume_id)
+        if cached is not None and time.monotonic() - cached[0] < RESUME_TEXT_TTL:
+            return cached[1]
+        headers = {**self._ua, "Authorization": f"Bearer {access_token}"}
+        resp = await self._request(
+            "resumes", "GET", f"/resumes/{resume_id}", headers=headers
+        )
+        text = _resume_text(codec.loads(resp.content))
+        self._resume_texts[resume_id] = (time.monotonic(), text)
+        return text
+
+    async def get_dictionaries(self) -> dict[str, Any]:
+        if (
+            self._dictionaries is None
+            or time.monotonic() - self._dictionaries_at > DICTIONARIES_TTL
+        ):
+            resp = await self._request(
+                "dictionaries", "GET", "/dictionaries", headers=self._ua
             )
-            resp.raise_for_status()
-            return resp.json()["items"]
+            self._dictionaries = codec.loads(resp.content)
+            self._dictionaries_at = time.monotonic()
+        return self._dictionaries
+
+    def snapshot(self) -> dict[str, Any]:
+        # monotonic stamps mean nothing to the next process, so store ages
+        now = time.monotonic()
+        return {
+            "dictionaries": (
+                [now - self._dictionaries_at, self._dictionaries]
+                if self._dictionaries is not None
+                else None
+            ),
+            "resume_texts": {
+                resume_id: [now - at, text]
+                for resume_id, (at, text) in self._resume_texts.items()
+                if now - at < RESUME_TEXT_TTL
+            },
+            "vacancies": self._details.snapshot(),
+        }
+
+    def restore(self, snapshot: dict[str, Any], elapsed: float) -> None:
+        now = time.monotonic()
+        dictionaries = snapshot.get("dictionaries")
+        if dictionaries is not None and dictionaries[0] + elapsed < DICTIONARIES_TTL:
+            self._dictionaries_at = now - dictionaries[0] - elapsed
+            self._dictionaries = dictionaries[1]
+        for resume_id, (age, text) in (snapshot.get("resume_texts") or {}).items():
+            if age + elapsed < RESUME_TEXT_TTL:
+                self._resume_texts[resume_id] = (now - age - elapsed, text)
+        self._details.restore(snapshot.get("vacancies") or [])
 
     async def get_experience(self, access_token: str) -> list[dict[str, Any]]:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{self._base}/dictionaries", headers=self._ua, timeout=30
-            )
-            resp.raise_for_status()
-            return resp.json()["experience"]
+        return (await self.get_dictionaries())["experience"]
+
+
+def _resume_text(resume: dict[str, Any]) -> str:
+    parts: list[str] = [resume.get("title") or "", resume.get("skills") or ""]
+    parts.extend(resume.get("skill_set") or ())
+    parts.extend(r.get("name") or "" for r in resume.get("professional_roles") or ())
+    for job in resume.get("experience") or ():
+        parts.append(job.get("position") or "")
+        parts.append(job.get("description") or "")
+    return "\n".join(p for p in parts if p)
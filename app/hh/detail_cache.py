@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional
+
+from hh.models import VacancyDetail
+
+logger = logging.getLogger(__name__)
+
+# expired rows are deleted from the disk tier every this many writes
+PRUNE_EVERY = 500
+
+
+# Vacancy details keyed by id and shared by every user, so a popular vacancy
+# is fetched once per TTL however many searches it shows up in. Concurrent
+# misses for the same id wait on one fetch. The optional SQLite tier lives in
+# its own file and keeps the cache warm across restarts.
+class VacancyDetailCache:
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[VacancyDetail]],
+        /,
+        max_size: int = 5000,
+        ttl: float = 6 * 3600,
+        db_path: Optional[str] = None,
+    ) -> None:
+        self._fetch = fetch
+        self._max_size = max_size
+        self._ttl = ttl
+        self._db_path = db_path
+        self._entries: OrderedDict[str, tuple[float, VacancyDetail]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task[VacancyDetail]] = {}
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.fetches = 0
+        if db_path is not None:
+            self._init_db()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, vacancy_id: str) -> VacancyDetail:
+        entry = self._entries.get(vacancy_id)
+        if entry is not None:
+            if time.time() - entry[0] < self._ttl:
+                self._entries.move_to_end(vacancy_id)
+                self.hits += 1
+                return entry[1]
+            del self._entries[vacancy_id]
+
+        task = self._inflight.get(vacancy_id)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # the fetch belongs to no caller, so whoever started it can be
+            # cancelled without taking the result away from the others
+            task = asyncio.create_task(self._load(vacancy_id))
+            self._inflight[vacancy_id] = task
+            task.add_done_callback(partial(self._loaded, vacancy_id))
+        return await asyncio.shield(task)
+
+    def _loaded(self, vacancy_id: str, task: asyncio.Task[VacancyDetail]) -> None:
+        del self._inflight[vacancy_id]
+        if not task.cancelled():
+            # every caller may have given up; don't log "exception never retrieved"
+            task.exception()
+
+    async def _load(self, vacancy_id: str) -> VacancyDetail:
+        if self._db_path is not None:
+            stored = await asyncio.to_thread(self._disk_get, vacancy_id)
+            if stored is not None:
+                self.disk_hits += 1
+                self._put(vacancy_id, *stored)
+                return stored[1]
+
+        self.fetches += 1
+        detail = await self._fetch(vacancy_id)
+        fetched_at = time.time()
+        self._put(vacancy_id, fetched_at, detail)
+        if self._db_path is not None:
+            try:
+                await asyncio.to_thread(self._disk_put, detail, fetched_at)
+            except sqlite3.Error as e:
+                logger.warning("caching vacancy %s on disk failed: %r", vacancy_id, e)
+        return detail
+
+    def _put(self, vacancy_id: str, fetched_at: float, detail: VacancyDetail) -> None:
+        self._entries[vacancy_id] = (fetched_at, detail)
+        self._entries.move_to_end(vacancy_id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        assert self._db_path is not None
+        return sqlite3.connect(self._db_path, timeout=5)
+
+    def _init_db(self) -> None:
+        assert self._db_path is not None
+        os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
+        db = self._connect()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("""
+                CREATE TABLE IF NOT EXISTS vacancy_detail (
+                    vacancy_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """)
+        db.commit()
+        db.close()
+
+    def _disk_get(self, vacancy_id: str) -> Optional[tuple[float, VacancyDetail]]:
+        db = self._connect()
+        try:
+            row = db.execute(
+                "SELECT data, fetched_at FROM vacancy_detail WHERE vacancy_id = ? AND fetched_at > ?",
+                (vacancy_id, time.time() - self._ttl),
+            ).fetchone()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        return row[1], VacancyDetail(**json.loads(row[0]))
+
+    def _disk_put(self, detail: VacancyDetail, fetched_at: float) -> None:
+        db = self._connect()
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO vacancy_detail (vacancy_id, data, fetched_at) VALUES (?, ?, ?)",
+                (detail.id, json.dumps(asdict(detail), ensure_ascii=False), fetched_at),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                db.execute(
+                    "DELETE FROM vacancy_detail WHERE fetched_at <= ?",
+                    (time.time() - self._ttl,),
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    def snapshot(self) -> list[list[Any]]:
+        cutoff = time.time() - self._ttl
+        return [
+            [fetched_at, asdict(detail)]
+            for fetched_at, detail in self._entries.values()
+            if fetched_at > cutoff
+        ]
+
+    def restore(self, entries: list[list[Any]]) -> None:
+        cutoff = time.time() - self._ttl
+        for fetched_at, data in entries:
+            if fetched_at > cutoff:
+                detail = VacancyDetail(**data)
+                self._put(detail.id, fetched_at, detail)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "ttl_sec": self._ttl,
+            "disk": self._db_path is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "inflight": len(self._inflight),
+        }
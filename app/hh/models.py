@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import re
+import sys
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass(slots=True, frozen=True)
+class Vacancy:
+    id: str
+    name: str
+    alternate_url: str
+    has_test: bool
+    response_letter_required: bool
+    archived: bool
+    employer_id: Optional[str]
+    employer_name: Optional[str]
+    salary_from: Optional[int]
+    salary_to: Optional[int]
+    salary_currency: Optional[str]
+    experience_id: Optional[str]
+    area_name: Optional[str]
+    published_at: Optional[str]
+    requirement: Optional[str]
+    responsibility: Optional[str]
+    raw: Optional[dict[str, Any]] = None
+
+    @classmethod
+    def from_json(cls, item: dict[str, Any], keep_raw: bool = False) -> Vacancy:
+        employer = item.get("employer") or {}
+        salary = item.get("salary") or {}
+        experience = item.get("experience") or {}
+        area = item.get("area") or {}
+        snippet = item.get("snippet") or {}
+        return cls(
+            id=item["id"],
+            name=item["name"],
+            alternate_url=item["alternate_url"],
+            has_test=bool(item.get("has_test")),
+            response_letter_required=bool(item.get("response_letter_required")),
+            archived=bool(item.get("archived")),
+            employer_id=employer.get("id"),
+            employer_name=employer.get("name"),
+            salary_from=salary.get("from"),
+            salary_to=salary.get("to"),
+            salary_currency=_intern(salary.get("currency")),
+            experience_id=_intern(experience.get("id")),
+            area_name=_intern(area.get("name")),
+            published_at=item.get("published_at"),
+            requirement=_strip_highlight(snippet.get("requirement")),
+            responsibility=_strip_highlight(snippet.get("responsibility")),
+            raw=item if keep_raw else None,
+        )
+
+
+# fields of /vacancies/{id} that the search listing leaves out
+@dataclass(slots=True, frozen=True)
+class VacancyDetail:
+    id: str
+    archived: bool
+    has_test: bool
+    test_required: bool
+    response_letter_required: bool
+    description: str
+
+    @classmethod
+    def from_json(cls, item: dict[str, Any]) -> VacancyDetail:
+        test = item.get("test") or {}
+        return cls(
+            id=item["id"],
+            archived=bool(item.get("archived")),
+            has_test=bool(item.get("has_test")),
+            test_required=bool(test.get("required")),
+            response_letter_required=bool(item.get("response_letter_required")),
+            description=_strip_tags(item.get("description") or ""),
+        )
+
+
+_TAG = re.compile(r"<[^>]+>")
+
+
+def _strip_tags(s: str) -> str:
+    return " ".join(_TAG.sub(" ", s).split())
+
+
+def _intern(s: str | None) -> str | None:
+    return sys.intern(s) if s else s
+
+
+def _strip_highlight(s: str | None) -> str | None:
+    if not s:
+        return None
+    return s.replace("<highlighttext>", "").replace("</highlighttext>", "")
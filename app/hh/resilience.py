@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Statuses that guarantee the server did not act on a non-idempotent request.
+SAFE_RETRY_STATUSES = frozenset({429, 503})
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint: str, retry_in: float) -> None:
+        super().__init__(f"hh.ru {endpoint} is unavailable, retry in {retry_in:.0f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    __slots__ = (
+        "_endpoint",
+        "_threshold",
+        "_cooldown",
+        "_failures",
+        "_opened_at",
+        "_probing",
+    )
+
+    def __init__(self, endpoint: str, threshold: int, cooldown: float) -> None:
+        self._endpoint = endpoint
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_call(self) -> None:
+        if self._opened_at is None:
+            return
+        elapsed = time.monotonic() - self._opened_at
+        if elapsed < self._cooldown or self._probing:
+            raise CircuitOpenError(self._endpoint, max(self._cooldown - elapsed, 0))
+        # half-open: let a single probe through
+        self._probing = True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def release_probe(self) -> None:
+        # the probe ended without an answer either way (cancelled, or an
+        # error nobody classified); the next call gets to probe instead
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self._threshold:
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def retry_after(resp: httpx.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return max((at - datetime.now(timezone.utc)).total_seconds(), 0.0)
@@ -1,54 +1,178 @@
 import asyncio
-from aiogram import Bot, Dispatcher
+import logging
+import os
+from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
 from aiohttp import web
 
-from bot.handlers import menu as menu_handlers
+from api.admin import AdminApi
+from bot.dispatcher import build_dispatcher
 from config.settings import Settings
 from hh.client import HHClient
+from monitoring.health import HealthMonitor
+from monitoring.watchdog import LoopWatchdog
+from runtime import speedups, warm_state
 from services.job_processor import JobProcessor
+from services.negotiation_sync import NegotiationSync
+from storage.fsm import SQLiteFSMStorage
+from storage.maintenance import DatabaseMaintenance
 from storage.sqlite_impl import SQLiteRepository
 from auth.oauth import OAuthManager
-from bot.commands.connect import build_router
-from bot.commands import filters as filters_cmds
-from bot.commands import menu
-from tasks.scheduler import start_scheduler
+from tasks.scheduler import (
+    start_maintenance,
+    start_negotiation_sync,
+    start_scheduler,
+)
 
 
-async def main() -> None:
-    settings = Settings()
+async def main(settings: Settings, runtime: speedups.Runtime) -> None:
+    logging.info("running with %s loop and %s", runtime.loop, runtime.json)
 
-    repo = SQLiteRepository(settings.database_url)
+    repo = SQLiteRepository(
+        settings.database_url,
+        flush_interval=settings.db_flush_interval_ms / 1000,
+        flush_batch_size=settings.db_flush_batch_size,
+    )
     await repo.init()
 
     bot = Bot(
         token=settings.telegram_token.get_secret_value(),
         default=DefaultBotProperties(parse_mode="HTML"),
+        session=speedups.bot_session(runtime),
     )
 
     hh_client = HHClient(settings)
 
     oauth = OAuthManager(settings, repo, bot, hh_client)
-    processor = JobProcessor(repo, hh_client, bot, oauth)
+    oauth.start()
+    negotiation_sync = NegotiationSync(repo, hh_client, oauth)
+    processor = JobProcessor(
+        repo,
+        hh_client,
+        bot,
+        oauth,
+        apply_delay=settings.apply_delay_sec,
+        apply_concurrency=settings.apply_concurrency,
+        ranking_pool=settings.ranking_pool_size,
+        ranking_factor=settings.ranking_pool_factor,
+        negotiation_sync=negotiation_sync,
+        token_concurrency=settings.pipeline_token_concurrency,
+        search_concurrency=settings.pipeline_search_concurrency,
+        filter_concurrency=settings.pipeline_filter_concurrency,
+        notify_concurrency=settings.pipeline_notify_concurrency,
+        queue_size=settings.pipeline_queue_size,
+    )
+
+    period_sec = settings.poll_interval_minutes * 60
+    warm_path = settings.warm_state_path or os.path.join(
+        settings.database_url, "warm_state.json"
+    )
+    await processor.restore(
+        period_sec,
+        await asyncio.to_thread(
+            warm_state.load, warm_path, settings.warm_state_max_age_hours * 3600
+        ),
+    )
 
-    await start_scheduler(processor, period_sec=settings.poll_interval_minutes * 60)
+    try:
+        await hh_client.get_dictionaries()
+    except Exception:
+        logging.exception("failed to warm up hh.ru dictionaries")
+
+    scheduler_task = await start_scheduler(processor, period_sec=period_sec)
+    sync_task = await start_negotiation_sync(
+        negotiation_sync, period_sec=settings.negotiation_sync_interval_minutes * 60
+    )
+    maintenance = DatabaseMaintenance(
+        repo,
+        lambda: processor.idle_for(period_sec) >= settings.db_maintenance_min_quiet_sec,
+        backup_dir=settings.db_backup_dir
+        or os.path.join(settings.database_url, "backups"),
+        keep_backups=settings.db_backup_keep,
+        backup_interval=settings.db_backup_interval_hours * 3600,
+        maintenance_interval=settings.db_maintenance_interval_hours * 3600,
+        pages_per_step=settings.db_backup_pages_per_step,
+    )
+    maintenance_task = await start_maintenance(maintenance)
+    watchdog = LoopWatchdog(
+        threshold=settings.watchdog_threshold_ms / 1000,
+        interval=settings.watchdog_interval_ms / 1000,
+    )
+    watchdog.start()
+    health = HealthMonitor(
+        processor,
+        repo,
+        hh_client,
+        watchdog,
+        period_sec=period_sec,
+        max_scheduler_lag_sec=settings.health_max_scheduler_lag_sec,
+        max_loop_lag_sec=settings.health_max_loop_lag_sec,
+    )
+    health.start(scheduler_task)
 
-    dp = Dispatcher()
-    dp.include_router(build_router(oauth))
-    dp.include_router(filters_cmds.setup(repo, hh_client))
-    dp.include_router(menu.setup(repo, hh_client))
-    dp.include_router(menu_handlers.setup(repo, hh_client, bot))
+    fsm_storage = SQLiteFSMStorage(
+        repo,
+        state_ttl=settings.fsm_state_ttl_hours * 3600,
+        cache_ttl=settings.fsm_cache_ttl_sec,
+    )
+    fsm_storage.start()
+    dp = build_dispatcher(
+        repo,
+        hh_client,
+        bot,
+        oauth,
+        fsm_storage,
+        max_profiles=settings.max_search_profiles,
+    )
 
     app = web.Application()
-    app.add_routes([web.get("/oauth/callback", oauth.callback)])
+    app.add_routes(
+        [
+            web.get("/oauth/callback", oauth.callback),
+            web.get("/healthz", health.healthz),
+            web.get("/readyz", health.readyz),
+            *AdminApi(settings, processor, repo, maintenance, watchdog).routes(),
+        ]
+    )
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, "0.0.0.0", 8080)
     await site.start()
 
     print("Starting bot...")
-    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    try:
+        # SIGTERM/SIGINT stop polling; the bot session stays open so the
+        # drained cycle can still send its notifications
+        await dp.start_polling(
+            bot,
+            allowed_updates=dp.resolve_used_update_types(),
+            close_bot_session=False,
+        )
+    finally:
+        if not await processor.shutdown(settings.shutdown_timeout_sec):
+            logging.warning("cancelling the cycle, unfinished users resume on start")
+        scheduler_task.cancel()
+        sync_task.cancel()
+        maintenance_task.cancel()
+        # let a cancelled cycle unwind before what it uses is closed
+        await asyncio.gather(scheduler_task, return_exceptions=True)
+        watchdog.stop()
+        await runner.cleanup()
+        try:
+            await asyncio.to_thread(warm_state.save, warm_path, processor.warm_state())
+        except Exception:
+            logging.exception("saving warm state failed")
+        await hh_client.aclose()
+        await oauth.aclose()
+        await fsm_storage.close()
+        await bot.session.close()
+        await repo.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    settings = Settings()
+    runtime = speedups.install(settings.runtime_speedups)
+    speedups.run(main(settings, runtime), runtime)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Optional
+
+from aiohttp import web
+
+from hh.client import HHClient
+from monitoring.watchdog import LoopWatchdog
+from runtime.speedups import json_response
+from services.job_processor import JobProcessor
+from storage.sqlite_impl import SQLiteRepository
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        processor: JobProcessor,
+        repo: SQLiteRepository,
+        hh_client: HHClient,
+        watchdog: LoopWatchdog,
+        /,
+        period_sec: float,
+        max_scheduler_lag_sec: float = 300,
+        max_loop_lag_sec: float = 5.0,
+    ) -> None:
+        self._processor = processor
+        self._repo = repo
+        self._hh = hh_client
+        self._period = period_sec
+        self._max_scheduler_lag = max_scheduler_lag_sec
+        self._max_loop_lag = max_loop_lag_sec
+        self._watchdog = watchdog
+        self._scheduler_task: Optional[asyncio.Task[Any]] = None
+        self._warming: Optional[asyncio.Task[Any]] = None
+
+    def start(self, scheduler_task: asyncio.Task[Any]) -> None:
+        self._scheduler_task = scheduler_task
+
+    def scheduler_lag(self) -> float:
+        p = self._processor
+        last = p.last_cycle_finished_at or p.started_at
+        return max(time.time() - last - self._period, 0.0)
+
+    def _snapshot(self) -> dict[str, Any]:
+        p = self._processor
+        now = time.time()
+        lag, lag_max = self._watchdog.last_lag(), self._watchdog.max_lag()
+        return {
+            "loop_lag_ms": round(lag * 1000, 1) if lag is not None else None,
+            "loop_lag_max_ms": (
+                round(lag_max * 1000, 1) if lag_max is not None else None
+            ),
+            "loop_blocked_total": self._watchdog.blocked_total,
+            "scheduler_alive": self._scheduler_alive(),
+            "cycle_running": p.is_running,
+            "last_cycle_age_sec": (
+                round(now - p.last_cycle_finished_at, 1)
+                if p.last_cycle_finished_at
+                else None
+            ),
+            "last_cycle_duration_sec": (
+                round(p.last_cycle_duration, 1) if p.last_cycle_duration else None
+            ),
+            "scheduler_lag_sec": round(self.scheduler_lag(), 1),
+            "overdue_users": p.overdue_users(self._period),
+            "pipeline_depth": {s["name"]: s["depth"] for s in p.pipeline_stats()},
+            "hh_warm": self._hh.is_warm,
+            "vacancy_cache": self._hh.vacancy_cache_stats(),
+            "db_warm": self._repo.is_warm,
+        }
+
+    def _scheduler_alive(self) -> bool:
+        return self._scheduler_task is not None and not self._scheduler_task.done()
+
+    async def healthz(self, request: web.Request) -> web.Response:
+        body = self._snapshot()
+        recent = self._watchdog.max_lag(5.0)
+        ok = body["scheduler_alive"] and (recent is None or recent < self._max_loop_lag)
+        return json_response(body, status=200 if ok else 503)
+
+    async def readyz(self, request: web.Request) -> web.Response:
+        body = self._snapshot()
+        if not body["hh_warm"] and (self._warming is None or self._warming.done()):
+            # retry the startup warm-up so a transient hh.ru error doesn't stick
+            self._warming = asyncio.create_task(self._hh.get_dictionaries())
+            self._warming.add_done_callback(_ignore_result)
+        ok = (
+            body["scheduler_alive"]
+            and body["db_warm"]
+            and body["hh_warm"]
+            and body["scheduler_lag_sec"] <= self._max_scheduler_lag
+        )
+        return json_response(body, status=200 if ok else 503)
+
+
+def _ignore_result(task: asyncio.Task[Any]) -> None:
+    if not task.cancelled():
+        task.exception()
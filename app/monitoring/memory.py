@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import gc
+import linecache
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Optional
+
+from services.job_processor import JobProcessor
+
+# types whose live instance counts are worth watching between cycles
+WATCHED_TYPES = frozenset(
+    {
+        "sqlite3.Connection",
+        "sqlite3.Cursor",
+        "hh.models.Vacancy",
+        "services.job_processor._Candidate",
+        "storage.sqlite_impl.Token",
+        "storage.sqlite_impl.SearchProfile",
+        "httpx.Response",
+        "httpx.AsyncClient",
+        "aiogram.fsm.storage.base.StorageKey",
+        "_asyncio.Task",
+        "asyncio.tasks.Task",
+    }
+)
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryProfiler:
+    def __init__(self, processor: JobProcessor, /, top: int = 25) -> None:
+        self._processor = processor
+        self._top = top
+        self.last_profile: Optional[dict[str, Any]] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def _diff(
+        self, after: tracemalloc.Snapshot, before: tracemalloc.Snapshot, key: str
+    ) -> list[dict[str, Any]]:
+        return [
+            {
+                "where": (
+                    f"{s.traceback[0].filename}:{s.traceback[0].lineno}"
+                    if key == "lineno"
+                    else s.traceback[0].filename
+                ),
+                "size_diff_kb": round(s.size_diff / 1024, 1),
+                "size_kb": round(s.size / 1024, 1),
+                "count_diff": s.count_diff,
+            }
+            for s in after.compare_to(before, key)[: self._top]
+        ]
+
+    async def profile_cycle(self) -> dict[str, Any]:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            objects_before = live_objects()
+            before = self._snapshot()
+            started = time.perf_counter()
+            await self._processor.run_once()
+            elapsed = time.perf_counter() - started
+            after = self._snapshot()
+            objects_after = live_objects()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        self.last_profile = {
+            "cycle_sec": round(elapsed, 3),
+            "traced_kb": round(current / 1024, 1),
+            "traced_peak_kb": round(peak / 1024, 1),
+            "by_module": self._diff(after, before, "filename"),
+            "by_line": self._diff(after, before, "lineno"),
+            "live_objects_diff": {
+                name: objects_after.get(name, 0) - objects_before.get(name, 0)
+                for name in sorted(objects_before.keys() | objects_after.keys())
+            },
+        }
+        return self.last_profile
+
+    def summary(self) -> dict[str, Any]:
+        current, peak = (
+            tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        )
+        return {
+            "rss_kb": rss_kb(),
+            "tracing": tracemalloc.is_tracing(),
+            "traced_kb": round(current / 1024, 1),
+            "traced_peak_kb": round(peak / 1024, 1),
+            "gc": {
+                "counts": gc.get_count(),
+                "thresholds": gc.get_threshold(),
+                "generations": gc.get_stats(),
+            },
+            "live_objects": live_objects(),
+        }
+
+
+def live_objects() -> dict[str, int]:
+    counts: Counter[str] = Counter()
+    for obj in gc.get_objects():
+        t = type(obj)
+        name = f"{t.__module__}.{t.__qualname__}"
+        if name in WATCHED_TYPES:
+            counts[name] += 1
+    return dict(counts)
+
+
+def rss_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
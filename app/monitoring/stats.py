@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+
+def percentiles(
+    samples: Iterable[float], points: tuple[int, ...] = (50, 95, 99)
+) -> dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    last = len(ordered) - 1
+    return {f"p{p}": ordered[min(last, round(p / 100 * last))] for p in points}
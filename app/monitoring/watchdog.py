@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACK_DEPTH = 15
+MAX_SITES = 200
+
+
+@dataclass(slots=True)
+class _Offender:
+    count: int = 0
+    total_sec: float = 0.0
+    max_sec: float = 0.0
+    last_at: float = 0.0
+    stack: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class _Stall:
+    beat: float
+    sites: Counter[str] = field(default_factory=Counter)
+    stacks: dict[str, list[str]] = field(default_factory=dict)
+
+
+# A heartbeat task measures event loop lag. A sampling thread notices when the
+# heartbeat is late and grabs the loop thread's stack, so a stall is blamed on
+# the call that was running during it rather than on whatever ran next.
+class LoopWatchdog:
+    def __init__(
+        self,
+        /,
+        threshold: float = 0.1,
+        interval: float = 0.05,
+        window: float = 60.0,
+        ring_size: int = 100,
+        top: int = 20,
+    ) -> None:
+        self._threshold = threshold
+        self._interval = interval
+        self._poll = max(threshold / 5, 0.005)
+        self._top = top
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._heartbeat: Optional[asyncio.Task[None]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._beat = time.monotonic()
+        self._stall: Optional[_Stall] = None
+        self._offenders: dict[str, _Offender] = {}
+        self.lags: deque[float] = deque(maxlen=max(int(window / interval), 1))
+        self.recent: deque[dict[str, Any]] = deque(maxlen=ring_size)
+        self.blocked_total = 0
+        self.blocked_sec_total = 0.0
+
+    def start(self) -> None:
+        if self._heartbeat is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping.clear()
+        self._heartbeat = asyncio.create_task(self._beat_loop())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def last_lag(self) -> Optional[float]:
+        return self.lags[-1] if self.lags else None
+
+    def max_lag(self, window: Optional[float] = None) -> Optional[float]:
+        lags = list(self.lags)
+        if window is not None:
+            lags = lags[-max(int(window / self._interval), 1) :]
+        return max(lags) if lags else None
+
+    async def _beat_loop(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self._interval)
+            now = time.monotonic()
+            lag = max(now - started - self._interval, 0.0)
+            beat, self._beat = self._beat, now
+            self.lags.append(lag)
+            if lag >= self._threshold:
+                self._record(lag, beat)
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self._poll):
+            beat = self._beat
+            # start sampling before the threshold so short stalls get a sample
+            # too; the heartbeat discards it if the stall stays under it
+            if time.monotonic() - beat - self._interval < self._threshold / 2:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id or 0)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            site = _call_site(stack)
+            with self._lock:
+                if self._stall is None or self._stall.beat != beat:
+                    self._stall = _Stall(beat)
+                self._stall.sites[site] += 1
+                if site not in self._stall.stacks:
+                    self._stall.stacks[site] = _format(stack)
+
+    def _record(self, lag: float, beat: float) -> None:
+        with self._lock:
+            stall, self._stall = self._stall, None
+        if stall is not None and stall.beat == beat and stall.sites:
+            # the site seen in most samples is where the loop spent the stall
+            site = stall.sites.most_common(1)[0][0]
+            stack = stall.stacks[site]
+        else:
+            # too short for the sampler to catch, or many small callbacks
+            site, stack = "unknown", []
+        now = time.time()
+        self.blocked_total += 1
+        self.blocked_sec_total += lag
+        offender = self._offenders.get(site)
+        if offender is None:
+            if len(self._offenders) >= MAX_SITES:
+                del self._offenders[
+                    min(self._offenders, key=lambda s: self._offenders[s].total_sec)
+                ]
+            offender = self._offenders[site] = _Offender()
+        offender.count += 1
+        offender.total_sec += lag
+        offender.max_sec = max(offender.max_sec, lag)
+        offender.last_at = now
+        if stack:
+            offender.stack = stack
+        self.recent.append(
+            {"at": now, "blocked_ms": round(lag * 1000, 1), "site": site}
+        )
+        logger.warning("event loop blocked for %.0f ms at %s", lag * 1000, site)
+
+    def report(self) -> dict[str, Any]:
+        top = sorted(
+            self._offenders.items(), key=lambda kv: kv[1].total_sec, reverse=True
+        )[: self._top]
+        return {
+            "threshold_ms": round(self._threshold * 1000, 1),
+            "blocked_total": self.blocked_total,
+            "blocked_sec_total": round(self.blocked_sec_total, 3),
+            "lag_ms": _ms(self.last_lag()),
+            "lag_max_ms": _ms(self.max_lag()),
+            "top": [
+                {
+                    "site": site,
+                    "count": o.count,
+                    "total_ms": round(o.total_sec * 1000, 1),
+                    "max_ms": round(o.max_sec * 1000, 1),
+                    "last_at": o.last_at,
+                    "stack": o.stack,
+                }
+                for site, o in top
+            ],
+            "recent": list(self.recent),
+        }
+
+
+def _call_site(stack: traceback.StackSummary) -> str:
+    # innermost frame in our own code; the library frames below it are usually
+    # sqlite3, json or the like being called from there
+    for f in reversed(stack):
+        if f.filename.startswith(APP_ROOT) and "site-packages" not in f.filename:
+            return _where(f)
+    return _where(stack[-1])
+
+
+def _format(stack: traceback.StackSummary) -> list[str]:
+    return [_where(f) for f in stack[-STACK_DEPTH:]]
+
+
+def _where(f: traceback.FrameSummary) -> str:
+    path = f.filename
+    if path.startswith(APP_ROOT):
+        path = os.path.relpath(path, APP_ROOT)
+    return f"{path}:{f.lineno} in {f.name}"
+
+
+def _ms(sec: Optional[float]) -> Optional[float]:
+    return round(sec * 1000, 1) if sec is not None else None
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Coroutine, Optional, TypeVar
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiohttp import web
+
+from hh import codec
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_dumps: Callable[[Any], str] = json.dumps
+
+
+# what the process actually ended up running with
+@dataclass(slots=True, frozen=True)
+class Runtime:
+    loop: str
+    json: str
+
+
+def install(enabled: bool) -> Runtime:
+    global _dumps
+    fast_json = enabled and codec.orjson is not None
+    _dumps = codec.dumps if fast_json else json.dumps
+    runtime = Runtime(
+        loop="uvloop" if enabled and uvloop is not None else "asyncio",
+        json="orjson" if fast_json else "json",
+    )
+    if enabled and (uvloop is None or codec.orjson is None):
+        logger.warning(
+            "speedups requested but not installed, running with %s loop and %s",
+            runtime.loop,
+            runtime.json,
+        )
+    return runtime
+
+
+def run(main: Coroutine[Any, Any, T], runtime: Runtime) -> T:
+    if runtime.loop == "uvloop":
+        return uvloop.run(main)
+    return asyncio.run(main)
+
+
+def bot_session(runtime: Runtime) -> Optional[AiohttpSession]:
+    # None keeps aiogram's default session
+    if runtime.json != "orjson":
+        return None
+    return AiohttpSession(json_loads=codec.loads, json_dumps=codec.dumps)
+
+
+def json_response(data: Any, /, status: int = 200) -> web.Response:
+    return web.json_response(data, status=status, dumps=_dumps)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Optional
+
+from hh import codec
+
+logger = logging.getLogger(__name__)
+
+
+# Caches written on shutdown and read back on start, so a deploy doesn't have
+# to refetch dictionaries, resumes and vacancy details or retokenize every
+# vacancy before the first cycle is up to speed again.
+def save(path: str, state: dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(codec.dumps({"saved_at": time.time(), "state": state}))
+    os.replace(tmp, path)
+
+
+def load(path: str, max_age: float) -> Optional[tuple[dict[str, Any], float]]:
+    try:
+        with open(path, "rb") as f:
+            data = codec.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("reading warm state from %s failed: %r", path, e)
+        return None
+    elapsed = max(time.time() - data["saved_at"], 0.0)
+    if elapsed > max_age:
+        logger.info("warm state in %s is %.0f s old, ignoring it", path, elapsed)
+        return None
+    return data["state"], elapsed
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from string import Formatter
+from typing import Callable, Optional
+
+from hh.models import Vacancy
+
+PLACEHOLDERS_HELP = (
+    "Можно использовать подстановки: {vacancy} — название вакансии, "
+    "{employer} — компания, {salary} — зарплата. Фигурные скобки в тексте "
+    "пишутся как {{ и }}."
+)
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def _salary(v: Vacancy) -> str:
+    if v.salary_from is None and v.salary_to is None:
+        return ""
+    parts = []
+    if v.salary_from is not None:
+        parts.append(f"от {v.salary_from:,}".replace(",", " "))
+    if v.salary_to is not None:
+        parts.append(f"до {v.salary_to:,}".replace(",", " "))
+    if v.salary_currency:
+        parts.append(v.salary_currency)
+    return " ".join(parts)
+
+
+FIELDS: dict[str, Callable[[Vacancy], str]] = {
+    "vacancy": lambda v: v.name,
+    "employer": lambda v: v.employer_name or "",
+    "salary": _salary,
+}
+
+
+class CoverLetterTemplate:
+    __slots__ = ("_parts", "static")
+
+    def __init__(
+        self, parts: tuple[tuple[str, Optional[Callable[[Vacancy], str]]], ...]
+    ) -> None:
+        self._parts = parts
+        self.static: Optional[str] = (
+            "".join(lit for lit, _ in parts)
+            if all(field is None for _, field in parts)
+            else None
+        )
+
+    def render(self, v: Vacancy) -> str:
+        if self.static is not None:
+            return self.static
+        return "".join(
+            lit + field(v) if field is not None else lit for lit, field in self._parts
+        )
+
+
+@lru_cache(maxsize=4096)
+def compile_template(text: str) -> CoverLetterTemplate:
+    parts: list[tuple[str, Optional[Callable[[Vacancy], str]]]] = []
+    try:
+        parsed = list(Formatter().parse(text))
+    except ValueError:
+        raise TemplateError("Непарная фигурная скобка. " + PLACEHOLDERS_HELP) from None
+    for literal, name, spec, conversion in parsed:
+        if name is None:
+            parts.append((literal, None))
+            continue
+        if name not in FIELDS:
+            raise TemplateError(
+                f"Неизвестная подстановка {{{name}}}. " + PLACEHOLDERS_HELP
+            )
+        if spec or conversion:
+            raise TemplateError(
+                f"Подстановка {{{name}}} пишется без модификаторов. "
+                + PLACEHOLDERS_HELP
+            )
+        parts.append((literal, FIELDS[name]))
+    return CoverLetterTemplate(tuple(parts))
+
+
+def render(text: str, v: Vacancy) -> str:
+    try:
+        template = compile_template(text)
+    except TemplateError:
+        # letters saved before templates existed may contain stray braces
+        return text
+    return template.render(v)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+from collections import deque
+from itertools import count
+from typing import Generic, Hashable, Iterable, Iterator, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class _Flow(Generic[T]):
+    __slots__ = ("items", "weight", "start")
+
+    def __init__(self, items: deque[T], weight: float, start: float) -> None:
+        self.items = items
+        self.weight = weight
+        self.start = start
+
+
+# Start-time fair queuing: pop serves the flow with the smallest virtual start
+# tag and advances it by 1/weight. New flows start at the current virtual time,
+# so every flow is served in the first round and heavier flows get
+# proportionally more turns after that.
+class FairScheduler(Generic[K, T]):
+    def __init__(self) -> None:
+        self._flows: dict[K, _Flow[T]] = {}
+        self._heap: list[tuple[float, int, K]] = []
+        self._seq = count()
+        self._vtime = 0.0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[T]:
+        for flow in self._flows.values():
+            yield from flow.items
+
+    def add(self, key: K, items: Iterable[T], weight: float) -> None:
+        flow = self._flows.get(key)
+        if flow is not None:
+            before = len(flow.items)
+            flow.items.extend(items)
+            flow.weight = max(weight, 1e-9)
+            self._size += len(flow.items) - before
+            return
+        flow = _Flow(deque(items), max(weight, 1e-9), self._vtime)
+        if not flow.items:
+            return
+        self._flows[key] = flow
+        self._size += len(flow.items)
+        heapq.heappush(self._heap, (flow.start, next(self._seq), key))
+
+    def drop(self, key: K) -> int:
+        flow = self._flows.pop(key, None)
+        if flow is None:
+            return 0
+        self._size -= len(flow.items)
+        return len(flow.items)
+
+    def pop(self) -> Optional[tuple[K, T]]:
+        while self._heap:
+            start, _, key = heapq.heappop(self._heap)
+            flow = self._flows.get(key)
+            if flow is None or flow.start != start or not flow.items:
+                continue
+            item = flow.items.popleft()
+            self._size -= 1
+            self._vtime = start
+            flow.start = start + 1 / flow.weight
+            if flow.items:
+                heapq.heappush(self._heap, (flow.start, next(self._seq), key))
+            else:
+                del self._flows[key]
+            return key, item
+        return None
+
+
+# asyncio.Queue over a FairScheduler, so a pipeline stage gets fair ordering
+# with the usual maxsize backpressure and join(). Items are (key, item, weight).
+class FairQueue(asyncio.Queue, Generic[K, T]):
+    def _init(self, maxsize: int) -> None:
+        # asyncio.Queue sizes itself with len(self._queue)
+        self._queue = self._scheduler = FairScheduler[K, T]()
+
+    def _put(self, entry: tuple[K, T, float]) -> None:
+        key, item, weight = entry
+        self._scheduler.add(key, (item,), weight)
+
+    def _get(self) -> tuple[K, T]:
+        entry = self._scheduler.pop()
+        assert entry is not None
+        return entry
+
+    def drop(self, key: K) -> int:
+        dropped = self._scheduler.drop(key)
+        for _ in range(dropped):
+            self.task_done()
+            # the freed slots are what producers blocked in put() wait for
+            self._wakeup_next(self._putters)
+        return dropped
@@ -1,15 +1,72 @@
 from __future__ import annotations
 
 import asyncio
+import logging
+from collections import defaultdict, deque
+from contextlib import AsyncExitStack, aclosing
+from dataclasses import dataclass, field
 
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 import time
+from typing import Any, AsyncIterator, Optional
 
+import httpx
+import numpy as np
 from aiogram import Bot
 
-from storage.sqlite_impl import SQLiteRepository
-from hh.client import HHClient
-from auth.oauth import OAuthManager
+from storage.sqlite_impl import Filters, SQLiteRepository, Token, quota_day
+from hh.client import HHClient, PageCache
+from hh.models import Vacancy
+from monitoring.stats import percentiles
+from hh.resilience import CircuitOpenError
+from auth.oauth import (
+    OAuthManager,
+    TokenRevokedError,
+    TransientAuthError,
+    token_rejected,
+)
+from services.cover_letter import render
+from services.fair_queue import FairQueue
+from services.negotiation_sync import NegotiationSync
+from services.pipeline import Stage
+from services.ranking import Ranker, top_k
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _UserRun:
+    token: Token
+    remaining: int
+    pool: int
+    filters: Filters
+    applied: int = 0
+    # search and filter progress; the run is ranked once both are done
+    searching: bool = True
+    inflight: int = 0
+    # set by the filter stage whenever it has caught up with the search
+    settled: asyncio.Event = field(default_factory=asyncio.Event)
+    finalized: bool = False
+    seen: set[str] = field(default_factory=set)
+    candidates: list[_Candidate] = field(default_factory=list)
+    # queued applies not yet done, the user is notified when it reaches zero
+    left: int = 0
+    # cut short by shutdown, the next start picks the user up again
+    interrupted: bool = False
+
+
+@dataclass(slots=True, frozen=True)
+class _Search:
+    filters: Filters
+    resume_id: Optional[str]
+    cover_letter: Optional[str]
+
+
+@dataclass(slots=True, frozen=True)
+class _Candidate:
+    vacancy: Vacancy
+    resume_id: Optional[str]
+    cover_letter: Optional[str]
 
 
 class JobProcessor:
@@ -21,81 +78,566 @@ class JobProcessor:
         oauth: OAuthManager,
         /,
         per_page: int = 100,
+        apply_delay: float = 2.0,
+        apply_concurrency: int = 1,
+        ranking_pool: int = 300,
+        ranking_factor: int = 3,
+        negotiation_sync: Optional[NegotiationSync] = None,
+        token_concurrency: int = 4,
+        search_concurrency: int = 2,
+        filter_concurrency: int = 4,
+        notify_concurrency: int = 2,
+        queue_size: int = 100,
     ) -> None:
         self._repo = repo
         self._hh = hh
         self._bot = bot
         self._oauth = oauth
         self._per_page = per_page
+        self._apply_delay = apply_delay
+        self._concurrency = {
+            "token": token_concurrency,
+            "search": search_concurrency,
+            "filter": filter_concurrency,
+            "apply": apply_concurrency,
+            "notify": notify_concurrency,
+        }
+        self._queue_size = queue_size
+        self._stages: dict[str, Stage[Any]] = {}
+        self._runs: dict[int, _UserRun] = {}
+        self._page_cache: PageCache = {}
+        self._apply_started = 0.0
+        self._ranking_pool = ranking_pool
+        self._ranking_factor = ranking_factor
+        self._ranker = Ranker()
+        self._negotiation_sync = negotiation_sync
+        self._apply_latency: defaultdict[int, deque[float]] = defaultdict(
+            lambda: deque(maxlen=500)
+        )
+        self._cycle = 0
+        self._pending: set[int] = set()
+        self._run_lock = asyncio.Lock()
+        self._last_processed: dict[int, float] = {}
+        self._stopping = False
+        self._checkpoints: dict[int, dict[str, int]] = {}
+        self._resume_cutoff: Optional[float] = None
+        self.started_at = time.time()
+        self.last_cycle_started_at: Optional[float] = None
+        self.last_cycle_finished_at: Optional[float] = None
+        self.last_cycle_duration: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._run_lock.locked()
+
+    def idle_for(self, period_sec: float) -> float:
+        # seconds until the scheduler is expected to start the next cycle
+        if self.is_running or self.last_cycle_finished_at is None:
+            return 0.0
+        return max(self.last_cycle_finished_at + period_sec - time.time(), 0.0)
+
+    def overdue_users(self, period_sec: float) -> int:
+        cutoff = time.time() - period_sec
+        return sum(
+            1
+            for uid in self._pending
+            if self._last_processed.get(uid, self.started_at) < cutoff
+        )
+
+    @property
+    def is_stopping(self) -> bool:
+        return self._stopping
+
+    def pipeline_stats(self) -> list[dict[str, Any]]:
+        return [stage.stats() for stage in self._stages.values()]
+
+    def apply_latency(self) -> dict[int, dict[str, float]]:
+        return {
+            uid: percentiles(samples)
+            for uid, samples in self._apply_latency.items()
+            if samples
+        }
 
     async def run_once(self) -> None:
-        applied_cnt = 0
-        for token in self._repo.iter_tokens():
-            if token.expires_at <= datetime.now(timezone.utc):
-                token = await self._oauth.refresh_token(token.telegram_user_id)
-
-            filters = await self._repo.get_filters(token.telegram_user_id)
-            if not filters.get("is_applying"):
-                continue
-            vacancies = await self._hh.search_vacancies(
-                token.access_token, filters, per_page=self._per_page
-            )
-            applied_cnt, last_applied = await self._repo.get_applied_count(
-                token.telegram_user_id
-            )
-            applied_cnt = _update_last_applied(last_applied, applied_cnt)
-            if filters.get("frequency") and applied_cnt >= filters["frequency"]:
-                continue
+        # the scheduler and admin-triggered runs must not overlap
+        async with self._run_lock:
+            if not self._stopping:
+                await self._run_cycle()
 
-            for v in vacancies:
-                filters = await self._repo.get_filters(token.telegram_user_id)
-                if not filters.get("is_applying"):
-                    break
-                if filters.get("frequency") and applied_cnt >= filters["frequency"]:
+    async def restore(
+        self, period_sec: float, warm: Optional[tuple[dict[str, Any], float]] = None
+    ) -> None:
+        # pages reached by users the last process was stopped in the middle of
+        self._checkpoints = await self._repo.load_checkpoints(time.time() - period_sec)
+        self._last_processed.update(await self._repo.cycle_finished_at())
+        self._resume_cutoff = time.time() - period_sec
+        if warm is not None:
+            state, elapsed = warm
+            self._hh.restore(state.get("hh") or {}, elapsed)
+            self._ranker.restore(state.get("ranker") or {})
+        logger.info(
+            "resuming %d users from checkpoints, warm state %s",
+            len(self._checkpoints),
+            "loaded" if warm is not None else "missing",
+        )
+
+    def warm_state(self) -> dict[str, Any]:
+        return {"hh": self._hh.snapshot(), "ranker": self._ranker.snapshot()}
+
+    async def shutdown(self, timeout: float) -> bool:
+        # no new users or vacancies from here on; applies already sent to
+        # hh.ru finish and the notify stage drains
+        self._stopping = True
+        if not self.is_running:
+            return True
+        logger.info("waiting up to %.0f s for the current cycle to drain", timeout)
+        try:
+            async with asyncio.timeout(timeout):
+                async with self._run_lock:
+                    return True
+        except TimeoutError:
+            logger.warning("cycle did not drain in %.0f s", timeout)
+            return False
+
+    async def _run_cycle(self) -> None:
+        self.last_cycle_started_at = time.time()
+        tokens = list(self._repo.iter_tokens())
+        if tokens:
+            # rotate so the same users aren't always enqueued first
+            offset = self._cycle % len(tokens)
+            tokens = tokens[offset:] + tokens[:offset]
+        self._cycle += 1
+        if self._resume_cutoff is not None:
+            tokens = self._resume(tokens, self._resume_cutoff)
+            self._resume_cutoff = None
+        self._pending = {t.telegram_user_id for t in tokens}
+        self._apply_started = time.monotonic()
+        # token -> search -> filter -> apply -> notify
+        handlers = {
+            "token": self._check_token,
+            "search": self._search,
+            "filter": self._filter,
+            "apply": self._apply,
+            "notify": self._notify,
+        }
+        self._stages = {
+            name: Stage(
+                name,
+                handler,
+                concurrency=self._concurrency[name],
+                maxsize=self._queue_size,
+                queue=FairQueue(self._queue_size) if name == "apply" else None,
+            )
+            for name, handler in handlers.items()
+        }
+        try:
+            for stage in self._stages.values():
+                stage.start()
+            for token in tokens:
+                if self._stopping:
                     break
-                vacancy_id: str = v["id"]
-                if (
-                    await self._repo.is_applied(token.telegram_user_id, vacancy_id)
-                    or v["has_test"]
-                ):
-                    continue
-
-                try:
-                    await self._hh.apply(
-                        token.access_token,
-                        vacancy_id,
-                        filters.get("resume_id"),
-                        message=filters.get("cover_letter") or "",
-                    )
-                except Exception:
-                    await self._bot.send_message(
-                        token.telegram_user_id,
-                        f"Не удалось откликнуться на вакансию {v['name']}:\nСсылка на вакансию: {v['alternate_url']}\n",
-                    )
-                    continue
-                else:
-                    await self._repo.mark_applied(token.telegram_user_id, vacancy_id)
-                    applied_cnt += 1
-                    await self._repo.update_applied_count(
-                        token.telegram_user_id, applied_cnt
+                await self._stages["token"].put(token)
+            # a stage only gets work from the ones before it, so once a stage
+            # is drained everything it will ever see has been queued downstream
+            for stage in self._stages.values():
+                await stage.drain()
+        finally:
+            for stage in self._stages.values():
+                await stage.stop()
+            self._pending.clear()
+            self._runs = {}
+            self._page_cache = {}
+        self.last_cycle_finished_at = time.time()
+        self.last_cycle_duration = (
+            self.last_cycle_finished_at - self.last_cycle_started_at
+        )
+
+    def _resume(self, tokens: list[Token], cutoff: float) -> list[Token]:
+        # first cycle after a restart: users the previous process already got
+        # through recently wait for the next cycle, the ones it was stopped
+        # in the middle of continue from their checkpoints
+        resumed = [
+            t
+            for t in tokens
+            if t.telegram_user_id in self._checkpoints
+            or self._last_processed.get(t.telegram_user_id, 0.0) < cutoff
+        ]
+        logger.info(
+            "warm restart: %d of %d users due this cycle", len(resumed), len(tokens)
+        )
+        return resumed
+
+    async def _finish(self, uid: int) -> None:
+        self._pending.discard(uid)
+        self._last_processed[uid] = time.time()
+        await self._repo.mark_cycle_finished(uid)
+
+    async def _check_token(self, token: Token) -> None:
+        uid = token.telegram_user_id
+        if self._stopping:
+            return
+        try:
+            run = await self._prepare(token)
+        except (TokenRevokedError, TransientAuthError) as e:
+            logger.warning("skipping user %s: %s", uid, e)
+            run = None
+        except Exception:
+            logger.exception("checking user %s failed", uid)
+            run = None
+        if run is None:
+            await self._finish(uid)
+            return
+        self._runs[uid] = run
+        await self._stages["search"].put(run)
+
+    async def _prepare(self, token: Token) -> Optional[_UserRun]:
+        if token.expires_at <= datetime.now(timezone.utc):
+            token = await self._oauth.refresh_token(token.telegram_user_id)
+
+        filters = await self._repo.get_filters(token.telegram_user_id)
+        if not filters.get("is_applying"):
+            return None
+        limit = filters.get("frequency") or 10
+        used = await self._repo.get_quota_used(token.telegram_user_id, quota_day())
+        remaining = limit - used
+        if remaining <= 0:
+            return None
+        # fetch a few times the quota and keep the best matches; capped, so a
+        # user with a handful of applies left doesn't page through hh.ru
+        pool = max(remaining, min(remaining * self._ranking_factor, self._ranking_pool))
+        return _UserRun(token, remaining, pool=pool, filters=filters)
+
+    async def _search(self, run: _UserRun) -> None:
+        uid = run.token.telegram_user_id
+        pages = self._checkpoints.pop(uid, {})
+        try:
+            if self._stopping:
+                run.interrupted = True
+                return
+            await self._sync_negotiations(run.token)
+            searches = await self._searches(uid, run.filters)
+            async with AsyncExitStack() as stack:
+                streams = []
+                for s in searches:
+                    key = _search_key(s.filters)
+                    start = pages.get(key, 0)
+                    vacancies = await stack.enter_async_context(
+                        aclosing(
+                            self._hh.iter_vacancies(
+                                run.token.access_token,
+                                s.filters,
+                                page=start,
+                                per_page=self._per_page,
+                                page_cache=self._page_cache,
+                            )
+                        )
                     )
-                finally:
-                    time.sleep(2)
+                    # [stream, search, key, vacancies taken, checkpointed page]
+                    streams.append([vacancies, s, key, start * self._per_page, start])
+                # take one vacancy from each profile in turn so a broad profile
+                # can't use up the whole quota before the others get a say
+                while streams:
+                    if self._stopping:
+                        run.interrupted = True
+                        break
+                    if len(run.candidates) + run.inflight >= run.pool:
+                        # enough queued to fill the pool unless some get
+                        # filtered out; find out before pulling more
+                        await self._settle(run)
+                        if len(run.candidates) >= run.pool:
+                            break
+                        continue
+                    for stream in list(streams):
+                        vacancies, s, key, taken, page = stream
+                        if taken // self._per_page > page:
+                            # the next pull fetches a page; skip it if what is
+                            # already queued covers the pool
+                            await self._settle(run)
+                            if len(run.candidates) >= run.pool:
+                                break
+                        v = await self._next_vacancy(uid, vacancies)
+                        if v is None:
+                            streams.remove(stream)
+                            continue
+                        stream[3] = taken + 1
+                        if taken // self._per_page > page:
+                            # a restart resumes this search from here
+                            stream[4] = taken // self._per_page
+                            await self._repo.save_checkpoint(uid, key, stream[4])
+                        run.inflight += 1
+                        await self._stages["filter"].put((run, v, s))
+                        if len(run.candidates) + run.inflight >= run.pool:
+                            break
+            if not run.interrupted:
+                await self._repo.clear_checkpoints(uid)
+        finally:
+            run.searching = False
+            if run.inflight == 0:
+                await self._finalize(run)
+
+    async def _settle(self, run: _UserRun) -> None:
+        while run.inflight:
+            run.settled.clear()
+            await run.settled.wait()
+
+    async def _sync_negotiations(self, token: Token) -> None:
+        if (
+            self._negotiation_sync is None
+            or await self._repo.get_negotiation_cursor(token.telegram_user_id)
+            is not None
+        ):
+            return
+        # first cycle for this user: learn what they applied to on the site
+        try:
+            await self._negotiation_sync.sync_user(token)
+            await self._repo.flush()
+        except Exception as e:
+            logger.warning(
+                "negotiation sync for user %s failed: %r", token.telegram_user_id, e
+            )
+
+    async def _filter(self, item: tuple[_UserRun, Vacancy, _Search]) -> None:
+        run, v, s = item
+        try:
+            # applied_vacancy writes are group-committed, so dedup the cycle
+            # in memory
+            if self._stopping:
+                run.interrupted = True
+                return
+            if v.id in run.seen:
+                return
+            run.seen.add(v.id)
+            if len(run.candidates) >= run.pool:
+                return
+            if v.response_letter_required and not s.cover_letter:
+                return
+            if await self._repo.is_applied(run.token.telegram_user_id, v.id):
+                return
+            if v.has_test and not await self._test_optional(v):
+                return
+            run.candidates.append(_Candidate(v, s.resume_id, s.cover_letter))
+        finally:
+            run.inflight -= 1
+            if run.inflight == 0:
+                run.settled.set()
+                if not run.searching:
+                    await self._finalize(run)
+
+    async def _test_optional(self, v: Vacancy) -> bool:
+        # the listing only says there is a test; the detail page says whether
+        # it has to be passed before applying
+        try:
+            detail = await self._hh.get_vacancy(v.id)
+        except Exception as e:
+            logger.warning("fetching vacancy %s failed: %r", v.id, e)
+            return False
+        return not detail.archived and not detail.test_required
+
+    async def _finalize(self, run: _UserRun) -> None:
+        if run.finalized:
+            return
+        run.finalized = True
+        uid = run.token.telegram_user_id
+        if self._stopping:
+            # nothing applied yet; the next start searches for this user again
+            return
+        candidates, run.candidates = run.candidates, []
+        if run.seen:
+            await self._repo.record_search(uid, len(run.seen), len(candidates))
+        run.seen = set()
+        if not candidates:
+            await self._finish(uid)
+            return
+        if len(candidates) > run.remaining:
+            candidates = await self._rank(run.token, candidates, run.remaining)
+        run.left = len(candidates)
+        for c in candidates:
+            await self._stages["apply"].put((uid, c, run.remaining))
+
+    async def _rank(
+        self, token: Token, candidates: list[_Candidate], k: int
+    ) -> list[_Candidate]:
+        texts: dict[str, str] = {}
+        for resume_id in {c.resume_id for c in candidates if c.resume_id}:
+            try:
+                texts[resume_id] = await self._hh.get_resume_text(
+                    token.access_token, resume_id
+                )
+            except Exception as e:
+                logger.warning("fetching resume %s failed: %r", resume_id, e)
+        if not texts:
+            return candidates[:k]
+
+        index = self._ranker.index([c.vacancy for c in candidates])
+        resume_ids = np.array([c.resume_id or "" for c in candidates])
+        scores = np.zeros(len(candidates))
+        for resume_id, text in texts.items():
+            rows = resume_ids == resume_id
+            scores[rows] = index.scores(self._ranker.terms(text))[rows]
+        return [candidates[i] for i in top_k(scores, k)]
+
+    async def _searches(self, uid: int, filters: Filters) -> list[_Search]:
+        searches: dict[str, _Search] = {}
+        ordered = [
+            _Search(filters, filters.get("resume_id"), filters.get("cover_letter"))
+        ]
+        for p in await self._repo.list_profiles(uid):
+            ordered.append(
+                _Search(
+                    p.as_filters(filters),
+                    p.resume_id or filters.get("resume_id"),
+                    p.cover_letter or filters.get("cover_letter"),
+                )
+            )
+        for s in ordered:
+            # identical queries would only find the same vacancies again
+            searches.setdefault(_search_key(s.filters), s)
+        return list(searches.values())
 
-            if applied_cnt > 0:
+    async def _next_vacancy(
+        self, uid: int, vacancies: AsyncIterator[Vacancy]
+    ) -> Optional[Vacancy]:
+        try:
+            return await anext(vacancies)
+        except StopAsyncIteration:
+            return None
+        except httpx.HTTPStatusError as e:
+            if not token_rejected(e.response):
+                logger.exception("vacancy search for user %s failed", uid)
+                return None
+            await self._oauth.quarantine(TokenRevokedError(uid, _failure_reason(e)))
+            return None
+        except Exception:
+            # one failing profile shouldn't stop the others
+            logger.exception("vacancy search for user %s failed", uid)
+            return None
+
+    async def _apply(self, item: tuple[int, _Candidate]) -> None:
+        uid, c = item
+        run = self._runs[uid]
+        try:
+            if self._stopping:
+                # still queued, so not sent; the user is searched again on start
+                run.interrupted = True
+            elif await self._apply_one(run, c):
+                self._apply_latency[uid].append(time.monotonic() - self._apply_started)
+            else:
+                queue = self._stages["apply"].queue
+                assert isinstance(queue, FairQueue)
+                run.left -= queue.drop(uid)
+        except Exception:
+            logger.exception("applying for user %s failed", uid)
+        finally:
+            run.left -= 1
+            if run.left <= 0:
+                await self._stages["notify"].put(run)
+
+    async def _apply_one(self, run: _UserRun, c: _Candidate) -> bool:
+        v = c.vacancy
+        uid = run.token.telegram_user_id
+        filters = await self._repo.get_filters(uid)
+        if not filters.get("is_applying"):
+            return False
+        day = quota_day()
+        if not await self._repo.reserve_quota(uid, filters.get("frequency") or 10, day):
+            return False
+        try:
+            await self._hh.apply(
+                run.token.access_token,
+                v.id,
+                c.resume_id,
+                message=render(c.cover_letter, v) if c.cover_letter else "",
+            )
+        except CircuitOpenError:
+            await self._repo.release_quota(uid, day)
+            await self._repo.record_apply(uid, v.id, "failed", reason="hh_unavailable")
+            logger.warning("hh.ru negotiations unavailable, skipping applies")
+            return False
+        except httpx.HTTPStatusError as e:
+            await self._repo.release_quota(uid, day)
+            if token_rejected(e.response):
+                await self._repo.record_apply(
+                    uid, v.id, "failed", reason=_failure_reason(e)
+                )
+                await self._oauth.quarantine(TokenRevokedError(uid, _failure_reason(e)))
+                return False
+            if _already_applied(e.response):
+                # applied outside the bot since the last negotiation sync
+                await self._repo.mark_applied(
+                    uid, v.id, name=v.name, url=v.alternate_url
+                )
+                await self._repo.record_apply(uid, v.id, "already_applied")
+            else:
+                await self._repo.record_apply(
+                    uid, v.id, "failed", reason=_failure_reason(e)
+                )
+                await self._notify_failure(uid, v)
+        except Exception as e:
+            await self._repo.release_quota(uid, day)
+            await self._repo.record_apply(
+                uid, v.id, "failed", reason=_failure_reason(e)
+            )
+            await self._notify_failure(uid, v)
+        else:
+            await self._repo.mark_applied(uid, v.id, name=v.name, url=v.alternate_url)
+            await self._repo.record_apply(uid, v.id, "applied")
+            run.applied += 1
+        finally:
+            if not self._stopping:
+                await asyncio.sleep(self._apply_delay)
+        return True
+
+    async def _notify(self, run: _UserRun) -> None:
+        uid = run.token.telegram_user_id
+        try:
+            if run.applied > 0:
                 await self._bot.send_message(
-                    token.telegram_user_id, f"Откликнулись на {applied_cnt} вакансий"
+                    uid, f"Откликнулись на {run.applied} вакансий"
                 )
+        except Exception:
+            logger.exception("notifying user %s failed", uid)
+        finally:
+            if not run.interrupted:
+                await self._finish(uid)
+
+    async def _notify_failure(self, uid: int, v: Vacancy) -> None:
+        await self._bot.send_message(
+            uid,
+            f"Не удалось откликнуться на вакансию {v.name}:\nСсылка на вакансию: {v.alternate_url}\n",
+        )
 
     async def loop(self, period_sec: int = 300) -> None:
         while True:
-            await self.run_once()
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("job processor cycle failed")
             await asyncio.sleep(period_sec)
 
 
-def _update_last_applied(last_applied: datetime, count: int) -> int:
-    if last_applied.replace(hour=0, minute=0, second=0) <= (
-        datetime.now(timezone.utc) - timedelta(days=1)
-    ).replace(hour=0, minute=0, second=0):
-        return 0
-    return count
+def _search_key(f: Filters) -> str:
+    return repr(
+        (
+            f.get("search_text"),
+            tuple(sorted(f.get("experience") or ())),
+            f.get("min_salary"),
+        )
+    )
+
+
+def _already_applied(resp: httpx.Response) -> bool:
+    return resp.status_code == 403 and b"already_applied" in resp.content
+
+
+def _failure_reason(e: Exception) -> str:
+    if isinstance(e, httpx.HTTPStatusError):
+        try:
+            errors = e.response.json().get("errors") or []
+        except (ValueError, AttributeError):
+            errors = []
+        values = [err["value"] for err in errors if err.get("value")]
+        status = e.response.status_code
+        return f"{status} {values[0]}" if values else str(status)
+    if isinstance(e, httpx.TransportError):
+        return "network"
+    return type(e).__name__
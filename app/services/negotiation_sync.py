@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import Optional
+
+from auth.oauth import OAuthManager, TokenRevokedError, TransientAuthError
+from hh.client import HHClient
+from storage.sqlite_impl import AppliedVacancy, SQLiteRepository, Token
+
+logger = logging.getLogger(__name__)
+
+
+class NegotiationSync:
+    def __init__(
+        self,
+        repo: SQLiteRepository,
+        hh: HHClient,
+        oauth: OAuthManager,
+        /,
+        per_page: int = 100,
+        batch_size: int = 500,
+    ) -> None:
+        self._repo = repo
+        self._hh = hh
+        self._oauth = oauth
+        self._per_page = per_page
+        self._batch_size = batch_size
+        self.last_synced_at: Optional[float] = None
+
+    async def run_once(self) -> None:
+        for token in list(self._repo.iter_tokens()):
+            try:
+                await self.sync_user(token)
+            except (TokenRevokedError, TransientAuthError) as e:
+                logger.warning("skipping negotiation sync: %s", e)
+            except Exception:
+                logger.exception(
+                    "syncing negotiations for user %s failed", token.telegram_user_id
+                )
+        self.last_synced_at = time.time()
+
+    async def sync_user(self, token: Token) -> int:
+        uid = token.telegram_user_id
+        if token.expires_at <= datetime.now(timezone.utc):
+            token = await self._oauth.refresh_token(uid)
+
+        cursor = await self._repo.get_negotiation_cursor(uid)
+        newest = cursor
+        started_at = time.time()
+        synced = 0
+        batch: list[AppliedVacancy] = []
+        # newest first, so an incremental run stops at the previous cursor;
+        # negotiations created in the same second as the cursor are re-read
+        async with aclosing(
+            self._hh.iter_negotiations(token.access_token, per_page=self._per_page)
+        ) as negotiations:
+            async for applied in negotiations:
+                if cursor is not None and applied.applied_at < cursor:
+                    break
+                if newest is None or applied.applied_at > newest:
+                    newest = applied.applied_at
+                batch.append(applied)
+                if len(batch) >= self._batch_size:
+                    await self._repo.mark_applied_many(uid, batch)
+                    synced += len(batch)
+                    batch = []
+        if batch:
+            await self._repo.mark_applied_many(uid, batch)
+            synced += len(batch)
+        # only move the cursor once the walk got all the way back to it; with
+        # nothing on hh.ru yet, anything applied later is newer than the walk
+        await self._repo.save_negotiation_cursor(
+            uid, newest if newest is not None else started_at
+        )
+        return synced
+
+    async def loop(self, period_sec: int = 1800) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("negotiation sync failed")
+            await asyncio.sleep(period_sec)
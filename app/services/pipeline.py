@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# A pool of workers draining one queue. The queue is bounded, so a slow stage
+# makes the stages feeding it wait instead of piling up work in memory.
+class Stage(Generic[T]):
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[T], Awaitable[None]],
+        /,
+        concurrency: int = 1,
+        queue: Optional[asyncio.Queue[T]] = None,
+        maxsize: int = 100,
+    ) -> None:
+        self.name = name
+        self.queue: asyncio.Queue[T] = (
+            queue if queue is not None else asyncio.Queue(maxsize)
+        )
+        self._handler = handler
+        self._concurrency = max(concurrency, 1)
+        self._workers: list[asyncio.Task[None]] = []
+        self._busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_sec = 0.0
+        self.max_depth = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    def start(self) -> None:
+        self.started_at = time.monotonic()
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"stage-{self.name}")
+            for _ in range(self._concurrency)
+        ]
+
+    async def put(self, item: T) -> None:
+        await self.queue.put(item)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def drain(self) -> None:
+        await self.queue.join()
+
+    async def stop(self) -> None:
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.stopped_at = time.monotonic()
+
+    async def _work(self) -> None:
+        while True:
+            item = await self.queue.get()
+            self.max_depth = max(self.max_depth, self.queue.qsize() + 1)
+            self._busy += 1
+            started = time.monotonic()
+            try:
+                await self._handler(item)
+            except Exception:
+                self.failed += 1
+                logger.exception("%s stage failed", self.name)
+            finally:
+                self._busy -= 1
+                self.processed += 1
+                self.busy_sec += time.monotonic() - started
+                self.queue.task_done()
+
+    def stats(self) -> dict[str, Any]:
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.stopped_at or time.monotonic()) - self.started_at
+        return {
+            "name": self.name,
+            "concurrency": self._concurrency,
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "busy_workers": self._busy,
+            "processed": self.processed,
+            "failed": self.failed,
+            "per_sec": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            # share of worker time spent handling items; the bottleneck stage
+            # is the one near 1.0 with a full queue in front of it
+            "utilization": (
+                round(self.busy_sec / (elapsed * self._concurrency), 3)
+                if elapsed
+                else 0.0
+            ),
+        }
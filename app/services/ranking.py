@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from typing import Any, Sequence
+
+import numpy as np
+
+from hh.models import Vacancy
+
+_WORD = re.compile(r"[^\W_]+(?:[+#]+|(?:\.[^\W_]+)*)")
+# crude stemming: Russian inflects word endings, so compare long words by prefix
+_STEM_LEN = 6
+_STOP_WORDS = frozenset(
+    "и в во на с со по для от до из за к о об а но или не что как это мы вы "
+    "the and or of to in for with on at by an be is are".split()
+)
+_STOP = -1
+
+
+def vacancy_text(v: Vacancy) -> str:
+    # the title carries the most signal in a search snippet, count it twice
+    return f"{v.name} {v.name} {v.requirement or ''} {v.responsibility or ''}"
+
+
+# BM25 over a fixed set of documents given as arrays of term ids. Term weights
+# for every (document, term) pair are computed once, so scoring a query is one
+# masked bincount.
+class BM25Index:
+    def __init__(
+        self, docs: Sequence[np.ndarray], /, k1: float = 1.2, b: float = 0.75
+    ) -> None:
+        self._n_docs = n = len(docs)
+        lengths = np.fromiter(map(len, docs), dtype=np.int64, count=n)
+        terms = np.concatenate(docs) if n else np.zeros(0, dtype=np.int64)
+        n_terms = int(terms.max()) + 1 if terms.size else 1
+        pairs, tf = np.unique(
+            np.repeat(np.arange(n, dtype=np.int64), lengths) * n_terms + terms,
+            return_counts=True,
+        )
+        self._pair_doc = pairs // n_terms
+        self._pair_term = pairs % n_terms
+
+        df = np.bincount(self._pair_term, minlength=n_terms)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        avgdl = lengths.mean() if lengths.any() else 1.0
+        norm = k1 * (1 - b + b * lengths[self._pair_doc] / avgdl)
+        self._pair_weight = idf[self._pair_term] * tf * (k1 + 1) / (tf + norm)
+
+    def __len__(self) -> int:
+        return self._n_docs
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        mask = np.isin(self._pair_term, query)
+        return np.bincount(
+            self._pair_doc[mask],
+            weights=self._pair_weight[mask],
+            minlength=self._n_docs,
+        )
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    # stable, so equal scores keep hh.ru's publication order
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+# Maps words to term ids and keeps the term arrays of recently seen vacancies,
+# so a vacancy found by several users or cycles is tokenized once.
+class Ranker:
+    def __init__(self, /, max_vocabulary: int = 200_000, max_docs: int = 50_000):
+        self._max_vocabulary = max_vocabulary
+        self._max_docs = max_docs
+        self._words: dict[str, int] = {}
+        self._terms: dict[str, int] = {}
+        self._docs: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    def _term_id(self, word: str) -> int:
+        if word in _STOP_WORDS:
+            term_id = _STOP
+        else:
+            term = word[:_STEM_LEN] if len(word) > _STEM_LEN + 2 else word
+            term_id = self._terms.setdefault(term, len(self._terms))
+        self._words[word] = term_id
+        return term_id
+
+    def terms(self, text: str) -> np.ndarray:
+        words = self._words
+        ids = [
+            words[w] if w in words else self._term_id(w)
+            for w in _WORD.findall(text.lower())
+        ]
+        return np.array([i for i in ids if i != _STOP], dtype=np.int64)
+
+    def vacancy_terms(self, v: Vacancy) -> np.ndarray:
+        terms = self._docs.get(v.id)
+        if terms is None:
+            terms = self._docs[v.id] = self.terms(vacancy_text(v))
+            if len(self._docs) > self._max_docs:
+                self._docs.popitem(last=False)
+        else:
+            self._docs.move_to_end(v.id)
+        return terms
+
+    def snapshot(self) -> dict[str, Any]:
+        # term ids only mean something together with the vocabulary
+        return {
+            "terms": dict(self._terms),
+            "docs": {vid: terms.tolist() for vid, terms in self._docs.items()},
+        }
+
+    def restore(self, snapshot: dict[str, Any]) -> None:
+        self._words.clear()
+        self._terms = dict(snapshot.get("terms") or {})
+        self._docs = OrderedDict(
+            (vid, np.array(terms, dtype=np.int64))
+            for vid, terms in (snapshot.get("docs") or {}).items()
+        )
+
+    # query terms must come from the same vocabulary, so build them after this
+    def index(self, vacancies: Sequence[Vacancy]) -> BM25Index:
+        if len(self._words) > self._max_vocabulary:
+            self._words.clear()
+            self._terms.clear()
+            self._docs.clear()
+        return BM25Index([self.vacancy_terms(v) for v in vacancies])
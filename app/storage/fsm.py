@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    StateType,
+    StorageKey,
+)
+
+from storage.sqlite_impl import SQLiteRepository
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("state", "data", "updated_at", "loaded_at")
+
+    def __init__(
+        self, state: Optional[str], data: dict[str, Any], updated_at: float
+    ) -> None:
+        self.state = state
+        self.data = data
+        self.updated_at = updated_at
+        self.loaded_at = time.monotonic()
+
+
+class SQLiteFSMStorage(BaseStorage):
+    def __init__(
+        self,
+        repo: SQLiteRepository,
+        /,
+        state_ttl: float = 86400,
+        cache_ttl: float = 5.0,
+        max_cached: int = 10000,
+        purge_interval: float = 600,
+    ) -> None:
+        self._repo = repo
+        self._state_ttl = state_ttl
+        self._cache_ttl = cache_ttl
+        self._max_cached = max_cached
+        self._purge_interval = purge_interval
+        self._keys = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._cache: OrderedDict[str, _Entry] = OrderedDict()
+        self._purge_task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._purge_task is None:
+            self._purge_task = asyncio.create_task(self._purge_loop())
+
+    async def close(self) -> None:
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            self._purge_task = None
+        await self._repo.flush()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._load(self._keys.build(key))
+        entry.state = state.state if isinstance(state, State) else state
+        self._store(self._keys.build(key), entry)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(self._keys.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        entry = await self._load(self._keys.build(key))
+        entry.data = dict(data)
+        self._store(self._keys.build(key), entry)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._load(self._keys.build(key))).data.copy()
+
+    async def _load(self, k: str) -> _Entry:
+        entry = self._cache.get(k)
+        now = time.time()
+        if entry is not None and time.monotonic() - entry.loaded_at < self._cache_ttl:
+            self._cache.move_to_end(k)
+        else:
+            row = await self._repo.load_fsm(k)
+            entry = _Entry(None, {}, now)
+            if row is not None:
+                state, data, updated_at = row
+                if updated_at + self._state_ttl > now:
+                    entry = _Entry(state, json.loads(data), updated_at)
+            self._remember(k, entry)
+        if entry.updated_at + self._state_ttl <= now:
+            entry.state, entry.data = None, {}
+        return entry
+
+    def _store(self, k: str, entry: _Entry) -> None:
+        entry.updated_at = time.time()
+        entry.loaded_at = time.monotonic()
+        self._remember(k, entry)
+        if entry.state is None and not entry.data:
+            self._repo.delete_fsm(k)
+        else:
+            self._repo.save_fsm(
+                k, entry.state, json.dumps(entry.data), entry.updated_at
+            )
+
+    def _remember(self, k: str, entry: _Entry) -> None:
+        self._cache[k] = entry
+        self._cache.move_to_end(k)
+        while len(self._cache) > self._max_cached:
+            self._cache.popitem(last=False)
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._purge_interval)
+            cutoff = time.time() - self._state_ttl
+            try:
+                await self._repo.purge_fsm(cutoff)
+            except Exception:
+                logger.exception("fsm purge failed")
+            for k in [k for k, e in self._cache.items() if e.updated_at <= cutoff]:
+                del self._cache[k]
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import glob
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from storage.sqlite_impl import SQLiteRepository
+
+logger = logging.getLogger(__name__)
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+# Online backups and housekeeping for app.db. Everything runs on its own
+# connection in a worker thread, and only when `quiet()` says the processor
+# is between cycles, so the bot's reads and the write-behind flusher keep going.
+class DatabaseMaintenance:
+    def __init__(
+        self,
+        repo: SQLiteRepository,
+        quiet: Callable[[], bool],
+        /,
+        backup_dir: str,
+        keep_backups: int = 7,
+        backup_interval: float = 24 * 3600,
+        maintenance_interval: float = 6 * 3600,
+        pages_per_step: int = 256,
+        step_sleep: float = 0.01,
+        vacuum_pages: int = 2000,
+        check_interval: float = 60.0,
+    ) -> None:
+        self._repo = repo
+        self._quiet = quiet
+        self._backup_dir = backup_dir
+        self._keep = max(keep_backups, 1)
+        self._backup_interval = backup_interval
+        self._maintenance_interval = maintenance_interval
+        self._pages_per_step = pages_per_step
+        self._step_sleep = step_sleep
+        self._vacuum_pages = vacuum_pages
+        self._check_interval = check_interval
+        self._lock = asyncio.Lock()
+        self.last_backup_at: Optional[float] = None
+        self.last_maintenance_at: Optional[float] = None
+        # latest report per job, served on /admin/maintenance
+        self.reports: dict[str, dict[str, Any]] = {}
+
+    async def loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._check_interval)
+            if not self._quiet():
+                continue
+            now = time.time()
+            try:
+                if _due(self.last_maintenance_at, self._maintenance_interval, now):
+                    await self.run_maintenance()
+                if self._quiet() and _due(
+                    self.last_backup_at, self._backup_interval, now
+                ):
+                    await self.backup()
+            except Exception:
+                logger.exception("database maintenance failed")
+
+    async def backup(self) -> dict[str, Any]:
+        async with self._lock:
+            # get buffered writes into the file before copying it
+            await self._repo.flush()
+            report = await self._timed("backup", self._backup)
+            self.last_backup_at = time.time()
+            return report
+
+    async def run_maintenance(self) -> dict[str, Any]:
+        async with self._lock:
+            await self._repo.flush()
+            report = await self._timed("maintenance", self._maintain)
+            self.last_maintenance_at = time.time()
+            return report
+
+    async def _timed(
+        self, name: str, job: Callable[[], dict[str, Any]]
+    ) -> dict[str, Any]:
+        started = time.perf_counter()
+        report: dict[str, Any] = {"started_at": time.time()}
+        try:
+            report.update(await asyncio.to_thread(job))
+            report["ok"] = True
+        except Exception as e:
+            logger.exception("database %s failed", name)
+            report["ok"] = False
+            report["error"] = repr(e)
+        report["duration_sec"] = round(time.perf_counter() - started, 3)
+        self.reports[name] = report
+        logger.info("database %s finished: %s", name, report)
+        return report
+
+    def _backup(self) -> dict[str, Any]:
+        os.makedirs(self._backup_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self._backup_dir, f"app-{stamp}.db")
+        tmp = path + ".part"
+        steps = 0
+        restarts = 0
+        remaining_before: Optional[int] = None
+
+        def progress(status: int, remaining: int, total: int) -> None:
+            nonlocal steps, restarts, remaining_before
+            steps += 1
+            # a write from another connection makes sqlite start over
+            if remaining_before is not None and remaining > remaining_before:
+                restarts += 1
+            remaining_before = remaining
+
+        src = sqlite3.connect(self._repo.db_path, timeout=30)
+        dst = sqlite3.connect(tmp)
+        try:
+            # copying a few pages at a time only holds the read lock briefly,
+            # so the write-behind flusher isn't held up by a large database
+            src.backup(
+                dst,
+                pages=self._pages_per_step,
+                progress=progress,
+                sleep=self._step_sleep,
+            )
+            check = dst.execute("PRAGMA quick_check").fetchone()[0]
+            if check != "ok":
+                raise sqlite3.DatabaseError(f"backup failed quick_check: {check}")
+        except BaseException:
+            dst.close()
+            os.remove(tmp)
+            raise
+        finally:
+            dst.close()
+            src.close()
+        os.replace(tmp, path)
+        return {
+            "path": path,
+            "size_kb": os.path.getsize(path) // 1024,
+            "steps": steps,
+            "restarts": restarts,
+            "removed": self._rotate(),
+        }
+
+    def _rotate(self) -> list[str]:
+        backups = sorted(glob.glob(os.path.join(self._backup_dir, "app-*.db")))
+        removed = backups[: -self._keep]
+        for path in removed:
+            os.remove(path)
+        return removed
+
+    def _maintain(self) -> dict[str, Any]:
+        report: dict[str, Any] = {}
+        db = sqlite3.connect(self._repo.db_path, timeout=5)
+        try:
+            started = time.perf_counter()
+            # TRUNCATE also resets the -wal file that grows between checkpoints
+            busy, log, checkpointed = db.execute(
+                "PRAGMA wal_checkpoint(TRUNCATE)"
+            ).fetchone()
+            report["checkpoint"] = {
+                "sec": round(time.perf_counter() - started, 3),
+                "busy": bool(busy),
+                "wal_pages": log,
+                "checkpointed": checkpointed,
+            }
+
+            started = time.perf_counter()
+            freelist = db.execute("PRAGMA freelist_count").fetchone()[0]
+            vacuumed = 0
+            if (
+                db.execute("PRAGMA auto_vacuum").fetchone()[0]
+                == AUTO_VACUUM_INCREMENTAL
+                and freelist
+            ):
+                vacuumed = min(freelist, self._vacuum_pages)
+                db.execute(f"PRAGMA incremental_vacuum({vacuumed})").fetchall()
+            report["incremental_vacuum"] = {
+                "sec": round(time.perf_counter() - started, 3),
+                "free_pages": freelist,
+                "vacuumed_pages": vacuumed,
+            }
+
+            started = time.perf_counter()
+            # keep ANALYZE cheap on large tables, optimize decides what is stale
+            db.execute("PRAGMA analysis_limit = 400")
+            db.execute("PRAGMA optimize")
+            report["optimize"] = {"sec": round(time.perf_counter() - started, 3)}
+            db.commit()
+        finally:
+            db.close()
+        return report
+
+
+def _due(last: Optional[float], interval: float, now: float) -> bool:
+    return last is None or now - last >= interval
@@ -1,10 +1,16 @@
 from datetime import datetime, timedelta, timezone
+import logging
 import sqlite3
 import os
-from typing import Generator, Optional, TypedDict
-from dataclasses import dataclass
+import time
+from typing import Callable, Generator, Iterable, Optional, TypedDict
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from storage.write_buffer import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass(slots=True, frozen=True)
 class Token:
@@ -24,15 +30,107 @@ class Filters(TypedDict, total=False):
     frequency: int
 
 
+@dataclass(slots=True)
+class SearchProfile:
+    id: int
+    telegram_user_id: int
+    name: str
+    search_text: str
+    resume_id: Optional[str] = None
+    cover_letter: Optional[str] = None
+    experience: list[str] = field(default_factory=list)
+    min_salary: Optional[int] = None
+
+    def as_filters(self, defaults: Filters) -> Filters:
+        # unset experience and salary come from the user's main filters, the
+        # same way resume and cover letter do
+        return Filters(
+            search_text=self.search_text,
+            experience=self.experience or defaults.get("experience") or [],
+            min_salary=(
+                self.min_salary
+                if self.min_salary is not None
+                else defaults.get("min_salary")
+            ),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class DailyStats:
+    day: str
+    seen: int
+    eligible: int
+    applied: int
+    failed: int
+    already_applied: int
+
+
+@dataclass(slots=True, frozen=True)
+class AppliedVacancy:
+    vacancy_id: str
+    name: Optional[str]
+    url: Optional[str]
+    # 0 for applications recorded before applied_at existed
+    applied_at: float
+
+
+# (applied_at, vacancy_id) of a history row, the keyset for paging
+HistoryCursor = tuple[float, str]
+
+_APPLIED_UPSERT = """
+    INSERT INTO applied_vacancy (telegram_user_id, vacancy_id, applied_at, name, url)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(telegram_user_id, vacancy_id) DO UPDATE SET
+        name = coalesce(applied_vacancy.name, excluded.name),
+        url = coalesce(applied_vacancy.url, excluded.url),
+        applied_at = CASE
+            WHEN applied_vacancy.applied_at = 0 THEN excluded.applied_at
+            ELSE applied_vacancy.applied_at
+        END
+    """
+
+
+@dataclass(slots=True, frozen=True)
+class Quarantine:
+    telegram_user_id: int
+    reason: str
+    failures: int
+    until: float
+
+
 class SQLiteRepository:
     _db_path: str
 
-    def __init__(self, db_url: str) -> None:
+    def __init__(
+        self,
+        db_url: str,
+        /,
+        flush_interval: float = 0.05,
+        flush_batch_size: int = 256,
+    ) -> None:
         os.makedirs(db_url, exist_ok=True)
         self._db_path = os.path.join(db_url, "app.db")
+        self._writes = WriteBehindBuffer(
+            self._db_path, flush_interval, flush_batch_size
+        )
+        self._trace: Optional[Callable[[str], None]] = None
+
+    def set_trace(self, callback: Optional[Callable[[str], None]]) -> None:
+        self._trace = callback
+        self._writes.set_trace(callback)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self._db_path)
+        if self._trace is not None:
+            db.set_trace_callback(self._trace)
+        return db
 
     async def init(self) -> None:
         db = sqlite3.connect(self._db_path, timeout=30)
+        # only takes effect on a new database; lets maintenance hand free pages
+        # back to the filesystem without a full VACUUM
+        db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        db.execute("PRAGMA journal_mode=WAL")
         db.execute(
             """
                 CREATE TABLE IF NOT EXISTS oauth_state (
@@ -72,52 +170,286 @@ class SQLiteRepository:
                 CREATE TABLE IF NOT EXISTS applied_vacancy (
                     telegram_user_id INTEGER NOT NULL,
                     vacancy_id TEXT NOT NULL,
+                    applied_at REAL NOT NULL DEFAULT 0,
+                    name TEXT,
+                    url TEXT,
                     PRIMARY KEY (telegram_user_id, vacancy_id)
                     )
                 """
         )
+        columns = {
+            row[1] for row in db.execute("PRAGMA table_info(applied_vacancy)")
+        }
+        if "applied_at" not in columns:
+            db.execute(
+                "ALTER TABLE applied_vacancy ADD COLUMN applied_at REAL NOT NULL DEFAULT 0"
+            )
+            db.execute("ALTER TABLE applied_vacancy ADD COLUMN name TEXT")
+            db.execute("ALTER TABLE applied_vacancy ADD COLUMN url TEXT")
+        db.execute(
+            """
+                CREATE INDEX IF NOT EXISTS idx_applied_vacancy_history
+                ON applied_vacancy (telegram_user_id, applied_at, vacancy_id)
+                """
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS user_daily_quota (
+                    telegram_user_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    used INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (telegram_user_id, day)
+                )
+                """
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS search_profile (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    telegram_user_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    search_text TEXT NOT NULL,
+                    resume_id TEXT,
+                    cover_letter TEXT,
+                    experience TEXT,
+                    min_salary INTEGER
+                )
+                """
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS search_profile_user ON search_profile (telegram_user_id)"
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS fsm_state (
+                    key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data TEXT NOT NULL DEFAULT '{}',
+                    updated_at REAL NOT NULL
+                )
+                """
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS fsm_state_updated_at ON fsm_state (updated_at)"
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS apply_event (
+                    id INTEGER PRIMARY KEY,
+                    telegram_user_id INTEGER NOT NULL,
+                    vacancy_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    at REAL NOT NULL,
+                    outcome TEXT NOT NULL,
+                    reason TEXT
+                )
+                """
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS daily_user_stats (
+                    telegram_user_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    seen INTEGER NOT NULL DEFAULT 0,
+                    eligible INTEGER NOT NULL DEFAULT 0,
+                    applied INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    already_applied INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (telegram_user_id, day)
+                )
+                """
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS daily_global_stats (
+                    day TEXT PRIMARY KEY,
+                    seen INTEGER NOT NULL DEFAULT 0,
+                    eligible INTEGER NOT NULL DEFAULT 0,
+                    applied INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    already_applied INTEGER NOT NULL DEFAULT 0
+                )
+                """
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS daily_user_failure (
+                    telegram_user_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    reason TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (telegram_user_id, day, reason)
+                )
+                """
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS daily_failure_reason (
+                    day TEXT NOT NULL,
+                    reason TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (day, reason)
+                )
+                """
+        )
+        # rollups are maintained in the same transaction as the event insert,
+        # so stats never need to read apply_event
+        db.execute(
+            """
+                CREATE TRIGGER IF NOT EXISTS apply_event_rollup
+                AFTER INSERT ON apply_event
+                BEGIN
+                    INSERT INTO daily_user_stats
+                        (telegram_user_id, day, applied, failed, already_applied)
+                    VALUES (
+                        NEW.telegram_user_id,
+                        NEW.day,
+                        NEW.outcome = 'applied',
+                        NEW.outcome = 'failed',
+                        NEW.outcome = 'already_applied'
+                    )
+                    ON CONFLICT(telegram_user_id, day) DO UPDATE SET
+                        applied = applied + excluded.applied,
+                        failed = failed + excluded.failed,
+                        already_applied = already_applied + excluded.already_applied;
+                    INSERT INTO daily_global_stats (day, applied, failed, already_applied)
+                    VALUES (
+                        NEW.day,
+                        NEW.outcome = 'applied',
+                        NEW.outcome = 'failed',
+                        NEW.outcome = 'already_applied'
+                    )
+                    ON CONFLICT(day) DO UPDATE SET
+                        applied = applied + excluded.applied,
+                        failed = failed + excluded.failed,
+                        already_applied = already_applied + excluded.already_applied;
+                    INSERT INTO daily_user_failure (telegram_user_id, day, reason, count)
+                    SELECT NEW.telegram_user_id, NEW.day, NEW.reason, 1
+                    WHERE NEW.outcome = 'failed'
+                    ON CONFLICT(telegram_user_id, day, reason) DO UPDATE SET
+                        count = count + 1;
+                    INSERT INTO daily_failure_reason (day, reason, count)
+                    SELECT NEW.day, NEW.reason, 1
+                    WHERE NEW.outcome = 'failed'
+                    ON CONFLICT(day, reason) DO UPDATE SET count = count + 1;
+                END
+                """
+        )
         db.execute(
             """
-                CREATE TABLE IF NOT EXISTS user_applied_count (
+                CREATE TABLE IF NOT EXISTS negotiation_sync (
+                    telegram_user_id INTEGER PRIMARY KEY,
+                    cursor REAL NOT NULL,
+                    synced_at REAL NOT NULL
+                )
+                """
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS user_quarantine (
+                    telegram_user_id INTEGER PRIMARY KEY,
+                    reason TEXT NOT NULL,
+                    failures INTEGER NOT NULL,
+                    until REAL NOT NULL,
+                    notified INTEGER NOT NULL DEFAULT 0
+                )
+                """
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS cycle_checkpoint (
                     telegram_user_id INTEGER NOT NULL,
-                    count INTEGER NOT NULL DEFAULT 0,
-                    last_applied TEXT NOT NULL,
-                    PRIMARY KEY (telegram_user_id)
+                    search_key TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (telegram_user_id, search_key)
+                )
+                """
+        )
+        db.execute(
+            """
+                CREATE TABLE IF NOT EXISTS user_cycle (
+                    telegram_user_id INTEGER PRIMARY KEY,
+                    finished_at REAL NOT NULL
                 )
                 """
         )
+        if db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_applied_count'"
+        ).fetchone():
+            db.execute(
+                """
+                    INSERT OR IGNORE INTO user_daily_quota (telegram_user_id, day, used)
+                    SELECT telegram_user_id, substr(last_applied, 1, 10), count
+                    FROM user_applied_count
+                    """
+            )
+            db.execute("DROP TABLE user_applied_count")
 
         db.commit()
+        if db.execute("PRAGMA auto_vacuum").fetchone()[0] == 0:
+            # databases created before incremental auto_vacuum only switch over
+            # on a full VACUUM; done once, at startup, before anything else runs
+            logger.info("rebuilding %s to enable incremental vacuum", self._db_path)
+            db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            db.execute("VACUUM")
+        db.close()
+        self._writes.start()
+
+    @property
+    def is_warm(self) -> bool:
+        return self._writes.running
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path
+
+    async def flush(self) -> None:
+        await self._writes.flush()
+
+    async def close(self) -> None:
+        await self._writes.close()
 
     async def save_state(self, state: str, tg_id: int) -> None:
         created_at = datetime.now(timezone.utc).isoformat()
-        db = sqlite3.connect(self._db_path)
-        db.execute(
+        await self._writes.execute(
             """
                 INSERT OR REPLACE INTO oauth_state (id, telegram_user_id, created_at)
                 VALUES (?, ?, ?)
                 """,
             (state, tg_id, created_at),
         )
-        db.commit()
 
-    async def pop_state(self, state: str) -> Optional[int]:
-        db = sqlite3.connect(self._db_path)
-        db.row_factory = sqlite3.Row
+    async def pop_state(
+        self, state: str, /, created_after: Optional[datetime] = None
+    ) -> Optional[int]:
+        db = self._connect()
         cur = db.execute(
-            "SELECT telegram_user_id FROM oauth_state WHERE id = ?", (state,)
+            "DELETE FROM oauth_state WHERE id = ? RETURNING telegram_user_id, created_at",
+            (state,),
         )
         row = cur.fetchone()
-        db.execute("DELETE FROM oauth_state WHERE id = ?", (state,))
         db.commit()
-        return row["telegram_user_id"] if row else None
+        if not row:
+            return None
+        if created_after and datetime.fromisoformat(row[1]) < created_after:
+            return None
+        return row[0]
+
+    def delete_state(self, state: str) -> None:
+        self._writes.submit("DELETE FROM oauth_state WHERE id = ?", (state,))
+
+    async def purge_states(self, created_before: datetime) -> None:
+        await self._writes.execute(
+            "DELETE FROM oauth_state WHERE created_at < ?",
+            (created_before.isoformat(),),
+        )
 
     async def save_token(
         self, tg_id: int, access: str, refresh: str, expires_in: int
     ) -> None:
         expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
-        db = sqlite3.connect(self._db_path)
-        db.execute(
+        await self._writes.execute(
             """
                 INSERT INTO token (telegram_user_id, access_token, refresh_token, expires_at)
                 VALUES (?, ?, ?, ?)
@@ -128,10 +460,9 @@ class SQLiteRepository:
                 """,
             (tg_id, access, refresh, expires_at.isoformat()),
         )
-        db.commit()
 
     async def get_token(self, tg_id: int) -> Optional[Token]:
-        db = sqlite3.connect(self._db_path)
+        db = self._connect()
         db.row_factory = sqlite3.Row
         cur = db.execute("SELECT * FROM token WHERE telegram_user_id = ?", (tg_id,))
         row = cur.fetchone()
@@ -149,7 +480,7 @@ class SQLiteRepository:
         )
 
     async def get_filters(self, tg_id: int) -> Filters:
-        db = sqlite3.connect(self._db_path)
+        db = self._connect()
         db.row_factory = sqlite3.Row
         cur = db.execute(
             "SELECT * FROM user_filters WHERE telegram_user_id = ?", (tg_id,)
@@ -170,11 +501,10 @@ class SQLiteRepository:
         )
 
     async def set_filters(self, tg_id: int, f: Filters) -> None:
-        db = sqlite3.connect(self._db_path)
         is_applying = False
         if f.get("is_applying"):
             is_applying = f.get("is_applying")
-        db.execute(
+        await self._writes.execute(
             """
                 INSERT INTO user_filters
                 (telegram_user_id, resume_id, is_applying, cover_letter, search_text, min_salary, experience, frequency)
@@ -199,12 +529,87 @@ class SQLiteRepository:
                 f.get("frequency") if f.get("frequency") else 10,
             ),
         )
+
+    async def list_profiles(self, tg_id: int) -> list[SearchProfile]:
+        db = self._connect()
+        db.row_factory = sqlite3.Row
+        cur = db.execute(
+            "SELECT * FROM search_profile WHERE telegram_user_id = ? ORDER BY id",
+            (tg_id,),
+        )
+        return [_profile_from_row(row) for row in cur]
+
+    async def get_profile(self, tg_id: int, profile_id: int) -> Optional[SearchProfile]:
+        db = self._connect()
+        db.row_factory = sqlite3.Row
+        cur = db.execute(
+            "SELECT * FROM search_profile WHERE telegram_user_id = ? AND id = ?",
+            (tg_id, profile_id),
+        )
+        row = cur.fetchone()
+        return _profile_from_row(row) if row else None
+
+    async def add_profile(
+        self,
+        tg_id: int,
+        name: str,
+        search_text: str,
+        /,
+        resume_id: Optional[str] = None,
+        cover_letter: Optional[str] = None,
+    ) -> int:
+        db = self._connect()
+        cur = db.execute(
+            """
+                INSERT INTO search_profile (telegram_user_id, name, search_text, resume_id, cover_letter)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+            (tg_id, name, search_text, resume_id, cover_letter),
+        )
         db.commit()
+        return cur.lastrowid
+
+    async def update_profile(self, p: SearchProfile) -> None:
+        await self._writes.execute(
+            """
+                UPDATE search_profile SET
+                    name = ?,
+                    search_text = ?,
+                    resume_id = ?,
+                    cover_letter = ?,
+                    experience = ?,
+                    min_salary = ?
+                WHERE id = ? AND telegram_user_id = ?
+                """,
+            (
+                p.name,
+                p.search_text,
+                p.resume_id,
+                p.cover_letter,
+                _serialize_list(p.experience),
+                p.min_salary,
+                p.id,
+                p.telegram_user_id,
+            ),
+        )
+
+    async def delete_profile(self, tg_id: int, profile_id: int) -> None:
+        await self._writes.execute(
+            "DELETE FROM search_profile WHERE telegram_user_id = ? AND id = ?",
+            (tg_id, profile_id),
+        )
 
     def iter_tokens(self) -> Generator[Token, None]:
-        db = sqlite3.connect(self._db_path)
+        db = self._connect()
         db.row_factory = sqlite3.Row
-        cur = db.execute("SELECT * FROM token")
+        cur = db.execute(
+            """
+                SELECT t.* FROM token t
+                LEFT JOIN user_quarantine q ON q.telegram_user_id = t.telegram_user_id
+                WHERE q.until IS NULL OR q.until <= ?
+                """,
+            (time.time(),),
+        )
         for row in cur:
             yield Token(
                 telegram_user_id=row["telegram_user_id"],
@@ -213,8 +618,53 @@ class SQLiteRepository:
                 expires_at=datetime.fromisoformat(row["expires_at"]),
             )
 
+    async def quarantine_user(
+        self, tg_id: int, reason: str, base_sec: float, max_sec: float
+    ) -> Optional[Quarantine]:
+        now = time.time()
+        db = self._connect()
+        # the backoff doubles per failure; a user already in quarantine is left
+        # alone so several failing calls in one cycle count as one failure
+        cur = db.execute(
+            """
+                INSERT INTO user_quarantine (telegram_user_id, reason, failures, until)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(telegram_user_id) DO UPDATE SET
+                    reason = excluded.reason,
+                    failures = failures + 1,
+                    until = ? + min(?, ? * (1 << min(failures, 30)))
+                WHERE until <= ?
+                RETURNING failures, until
+                """,
+            (tg_id, reason, now + base_sec, now, max_sec, base_sec, now),
+        )
+        row = cur.fetchone()
+        db.commit()
+        if row is None:
+            return None
+        return Quarantine(tg_id, reason, row[0], row[1])
+
+    async def claim_quarantine_notice(self, tg_id: int) -> bool:
+        db = self._connect()
+        cur = db.execute(
+            """
+                UPDATE user_quarantine SET notified = 1
+                WHERE telegram_user_id = ? AND notified = 0
+                RETURNING 1
+                """,
+            (tg_id,),
+        )
+        claimed = cur.fetchone() is not None
+        db.commit()
+        return claimed
+
+    async def clear_quarantine(self, tg_id: int) -> None:
+        db = self._connect()
+        db.execute("DELETE FROM user_quarantine WHERE telegram_user_id = ?", (tg_id,))
+        db.commit()
+
     async def is_applied(self, tg_id: int, vacancy_id: str) -> bool:
-        db = sqlite3.connect(self._db_path)
+        db = self._connect()
         db.row_factory = sqlite3.Row
         cur = db.execute(
             "SELECT * FROM applied_vacancy WHERE telegram_user_id = ? AND vacancy_id = ?",
@@ -222,32 +672,310 @@ class SQLiteRepository:
         )
         return bool(cur.fetchone())
 
-    async def mark_applied(self, tg_id: int, vacancy_id: str) -> None:
-        db = sqlite3.connect(self._db_path)
-        db.execute(
-            "INSERT OR IGNORE INTO applied_vacancy (telegram_user_id, vacancy_id) VALUES (?, ?)",
-            (tg_id, vacancy_id),
+    async def mark_applied(
+        self,
+        tg_id: int,
+        vacancy_id: str,
+        /,
+        name: Optional[str] = None,
+        url: Optional[str] = None,
+    ) -> None:
+        self._writes.submit(
+            _APPLIED_UPSERT, (tg_id, vacancy_id, time.time(), name, url)
+        )
+
+    async def mark_applied_many(
+        self, tg_id: int, applied: Iterable[AppliedVacancy]
+    ) -> None:
+        self._writes.submit(
+            _APPLIED_UPSERT,
+            [(tg_id, a.vacancy_id, a.applied_at, a.name, a.url) for a in applied],
+            many=True,
+        )
+
+    async def applied_history(
+        self,
+        tg_id: int,
+        /,
+        before: Optional[HistoryCursor] = None,
+        after: Optional[HistoryCursor] = None,
+        limit: int = 10,
+    ) -> tuple[list[AppliedVacancy], bool]:
+        # newest first; `before` pages towards older rows, `after` back towards
+        # newer ones. The bool says whether there are more rows that way.
+        db = self._connect()
+        if after is not None:
+            cur = db.execute(
+                """
+                    SELECT vacancy_id, name, url, applied_at FROM applied_vacancy
+                    WHERE telegram_user_id = ? AND (applied_at, vacancy_id) > (?, ?)
+                    ORDER BY applied_at, vacancy_id
+                    LIMIT ?
+                    """,
+                (tg_id, *after, limit + 1),
+            )
+        elif before is not None:
+            cur = db.execute(
+                """
+                    SELECT vacancy_id, name, url, applied_at FROM applied_vacancy
+                    WHERE telegram_user_id = ? AND (applied_at, vacancy_id) < (?, ?)
+                    ORDER BY applied_at DESC, vacancy_id DESC
+                    LIMIT ?
+                    """,
+                (tg_id, *before, limit + 1),
+            )
+        else:
+            cur = db.execute(
+                """
+                    SELECT vacancy_id, name, url, applied_at FROM applied_vacancy
+                    WHERE telegram_user_id = ?
+                    ORDER BY applied_at DESC, vacancy_id DESC
+                    LIMIT ?
+                    """,
+                (tg_id, limit + 1),
+            )
+        rows = [AppliedVacancy(*row) for row in cur.fetchall()]
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if after is not None:
+            rows.reverse()
+        return rows, more
+
+    async def get_negotiation_cursor(self, tg_id: int) -> Optional[float]:
+        db = self._connect()
+        cur = db.execute(
+            "SELECT cursor FROM negotiation_sync WHERE telegram_user_id = ?", (tg_id,)
+        )
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    async def save_negotiation_cursor(self, tg_id: int, cursor: float) -> None:
+        self._writes.submit(
+            """
+                INSERT INTO negotiation_sync (telegram_user_id, cursor, synced_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(telegram_user_id) DO UPDATE SET
+                    cursor = excluded.cursor,
+                    synced_at = excluded.synced_at
+                """,
+            (tg_id, cursor, time.time()),
+        )
+
+    async def save_checkpoint(self, tg_id: int, search_key: str, page: int) -> None:
+        self._writes.submit(
+            """
+                INSERT INTO cycle_checkpoint (telegram_user_id, search_key, page, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(telegram_user_id, search_key) DO UPDATE SET
+                    page = excluded.page,
+                    updated_at = excluded.updated_at
+                """,
+            (tg_id, search_key, page, time.time()),
+        )
+
+    async def clear_checkpoints(self, tg_id: int) -> None:
+        self._writes.submit(
+            "DELETE FROM cycle_checkpoint WHERE telegram_user_id = ?", (tg_id,)
         )
+
+    async def load_checkpoints(self, since: float) -> dict[int, dict[str, int]]:
+        db = self._connect()
+        # stale rows belong to a cycle too old to be worth resuming
+        db.execute("DELETE FROM cycle_checkpoint WHERE updated_at < ?", (since,))
         db.commit()
+        checkpoints: dict[int, dict[str, int]] = {}
+        for tg_id, search_key, page in db.execute(
+            "SELECT telegram_user_id, search_key, page FROM cycle_checkpoint"
+        ):
+            checkpoints.setdefault(tg_id, {})[search_key] = page
+        return checkpoints
 
-    async def update_applied_count(self, tg_id: int, count: int) -> None:
-        db = sqlite3.connect(self._db_path)
+    async def mark_cycle_finished(self, tg_id: int) -> None:
+        self._writes.submit(
+            """
+                INSERT INTO user_cycle (telegram_user_id, finished_at) VALUES (?, ?)
+                ON CONFLICT(telegram_user_id) DO UPDATE SET
+                    finished_at = excluded.finished_at
+                """,
+            (tg_id, time.time()),
+        )
+
+    async def cycle_finished_at(self) -> dict[int, float]:
+        db = self._connect()
+        return dict(
+            db.execute("SELECT telegram_user_id, finished_at FROM user_cycle").fetchall()
+        )
+
+    async def record_apply(
+        self,
+        tg_id: int,
+        vacancy_id: str,
+        outcome: str,
+        /,
+        reason: Optional[str] = None,
+    ) -> None:
+        now = time.time()
+        self._writes.submit(
+            """
+                INSERT INTO apply_event (telegram_user_id, vacancy_id, day, at, outcome, reason)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+            (tg_id, vacancy_id, quota_day(), now, outcome, reason),
+        )
+
+    async def record_search(self, tg_id: int, seen: int, eligible: int) -> None:
+        day = quota_day()
+        self._writes.submit(
+            """
+                INSERT INTO daily_user_stats (telegram_user_id, day, seen, eligible)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(telegram_user_id, day) DO UPDATE SET
+                    seen = seen + excluded.seen,
+                    eligible = eligible + excluded.eligible
+                """,
+            (tg_id, day, seen, eligible),
+        )
+        self._writes.submit(
+            """
+                INSERT INTO daily_global_stats (day, seen, eligible)
+                VALUES (?, ?, ?)
+                ON CONFLICT(day) DO UPDATE SET
+                    seen = seen + excluded.seen,
+                    eligible = eligible + excluded.eligible
+                """,
+            (day, seen, eligible),
+        )
+
+    async def user_stats(self, tg_id: int, since_day: str) -> list[DailyStats]:
+        db = self._connect()
+        cur = db.execute(
+            """
+                SELECT day, seen, eligible, applied, failed, already_applied
+                FROM daily_user_stats
+                WHERE telegram_user_id = ? AND day >= ?
+                ORDER BY day DESC
+                """,
+            (tg_id, since_day),
+        )
+        return [DailyStats(*row) for row in cur]
+
+    async def user_failures(self, tg_id: int, since_day: str) -> list[tuple[str, int]]:
+        db = self._connect()
+        cur = db.execute(
+            """
+                SELECT reason, SUM(count) FROM daily_user_failure
+                WHERE telegram_user_id = ? AND day >= ?
+                GROUP BY reason ORDER BY 2 DESC
+                """,
+            (tg_id, since_day),
+        )
+        return cur.fetchall()
+
+    async def global_stats(self, since_day: str) -> list[DailyStats]:
+        db = self._connect()
+        cur = db.execute(
+            """
+                SELECT day, seen, eligible, applied, failed, already_applied
+                FROM daily_global_stats
+                WHERE day >= ?
+                ORDER BY day DESC
+                """,
+            (since_day,),
+        )
+        return [DailyStats(*row) for row in cur]
+
+    async def global_failures(self, since_day: str) -> list[tuple[str, str, int]]:
+        db = self._connect()
+        cur = db.execute(
+            """
+                SELECT day, reason, count FROM daily_failure_reason
+                WHERE day >= ?
+                ORDER BY day DESC, count DESC
+                """,
+            (since_day,),
+        )
+        return cur.fetchall()
+
+    async def reserve_quota(self, tg_id: int, limit: int, day: str) -> bool:
+        db = self._connect()
+        cur = db.execute(
+            """
+                INSERT INTO user_daily_quota (telegram_user_id, day, used)
+                VALUES (?, ?, 1)
+                ON CONFLICT(telegram_user_id, day) DO UPDATE SET used = used + 1
+                WHERE used < ?
+                RETURNING used
+                """,
+            (tg_id, day, limit),
+        )
+        reserved = cur.fetchone() is not None
+        db.commit()
+        return reserved
+
+    async def release_quota(self, tg_id: int, day: str) -> None:
+        db = self._connect()
         db.execute(
-            "INSERT OR REPLACE INTO user_applied_count (telegram_user_id, count, last_applied) VALUES (?, ?, ?)",
-            (tg_id, count, datetime.now(timezone.utc).isoformat()),
+            "UPDATE user_daily_quota SET used = used - 1 WHERE telegram_user_id = ? AND day = ? AND used > 0",
+            (tg_id, day),
         )
         db.commit()
 
-    async def get_applied_count(self, tg_id: int) -> tuple[int, datetime]:
-        db = sqlite3.connect(self._db_path)
-        db.row_factory = sqlite3.Row
+    async def get_quota_used(self, tg_id: int, day: str) -> int:
+        db = self._connect()
         cur = db.execute(
-            "SELECT * FROM user_applied_count WHERE telegram_user_id = ?", (tg_id,)
+            "SELECT used FROM user_daily_quota WHERE telegram_user_id = ? AND day = ?",
+            (tg_id, day),
         )
         row = cur.fetchone()
-        if not row:
-            return 0, datetime.now(timezone.utc)
-        return (row["count"], datetime.fromisoformat(row["LAST_APPLIED"]))
+        return row[0] if row else 0
+
+    async def load_fsm(self, key: str) -> Optional[tuple[Optional[str], str, float]]:
+        db = self._connect()
+        cur = db.execute(
+            "SELECT state, data, updated_at FROM fsm_state WHERE key = ?", (key,)
+        )
+        row = cur.fetchone()
+        return (row[0], row[1], row[2]) if row else None
+
+    def save_fsm(
+        self, key: str, state: Optional[str], data: str, updated_at: float
+    ) -> None:
+        self._writes.submit(
+            """
+                INSERT INTO fsm_state (key, state, data, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    state=excluded.state,
+                    data=excluded.data,
+                    updated_at=excluded.updated_at
+                """,
+            (key, state, data, updated_at),
+        )
+
+    def delete_fsm(self, key: str) -> None:
+        self._writes.submit("DELETE FROM fsm_state WHERE key = ?", (key,))
+
+    async def purge_fsm(self, older_than: float) -> None:
+        await self._writes.execute(
+            "DELETE FROM fsm_state WHERE updated_at < ?", (older_than,)
+        )
+
+
+def quota_day(now: datetime | None = None) -> str:
+    return (now or datetime.now(timezone.utc)).astimezone(timezone.utc).date().isoformat()
+
+
+def _profile_from_row(row: sqlite3.Row) -> SearchProfile:
+    return SearchProfile(
+        id=row["id"],
+        telegram_user_id=row["telegram_user_id"],
+        name=row["name"],
+        search_text=row["search_text"],
+        resume_id=row["resume_id"],
+        cover_letter=row["cover_letter"],
+        experience=_deserialize_list(row["experience"]),
+        min_salary=row["min_salary"],
+    )
 
 
 def _serialize_list(lst: list[str] | None) -> str | None:
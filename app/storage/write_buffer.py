@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+from typing import Any, Callable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class _Write:
+    __slots__ = ("sql", "params", "many", "done")
+
+    def __init__(
+        self,
+        sql: str,
+        params: Sequence[Any],
+        many: bool,
+        done: Optional[asyncio.Future[None]],
+    ) -> None:
+        self.sql = sql
+        self.params = params
+        self.many = many
+        self.done = done
+
+
+class WriteBehindBuffer:
+    def __init__(self, db_path: str, flush_interval: float, max_batch: int) -> None:
+        self._db_path = db_path
+        self._flush_interval = flush_interval
+        self._max_batch = max_batch
+        self._pending: list[_Write] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._closing = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._trace: Optional[Callable[[str], None]] = None
+        self.batches = 0
+        self.statements = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def set_trace(self, callback: Optional[Callable[[str], None]]) -> None:
+        self._trace = callback
+        if self._conn is not None:
+            self._conn.set_trace_callback(callback)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def submit(
+        self, sql: str, params: Sequence[Any] = (), /, many: bool = False
+    ) -> None:
+        self._pending.append(_Write(sql, params, many, None))
+        if len(self._pending) >= self._max_batch:
+            self._wakeup.set()
+
+    async def execute(
+        self, sql: str, params: Sequence[Any] = (), /, many: bool = False
+    ) -> None:
+        done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._pending.append(_Write(sql, params, many, done))
+        self._wakeup.set()
+        if self._task is None:
+            await self.flush()
+        await done
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                await asyncio.to_thread(self._commit, batch)
+                self.batches += 1
+                self.statements += len(batch)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            # cancelling would abandon a batch still running in its thread and
+            # let the flush below use the connection at the same time, so ask
+            # the flusher to finish instead
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("write-behind flush failed")
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                self._db_path, timeout=30, check_same_thread=False
+            )
+            if self._trace is not None:
+                self._conn.set_trace_callback(self._trace)
+        return self._conn
+
+    def _commit(self, batch: list[_Write]) -> None:
+        try:
+            db = self._connection()
+            try:
+                for w in batch:
+                    _apply(db, w)
+                db.commit()
+            except Exception:
+                db.rollback()
+                # isolate the offending statement instead of dropping the batch
+                for w in batch:
+                    try:
+                        _apply(db, w)
+                        db.commit()
+                    except Exception as e:
+                        db.rollback()
+                        logger.error("write-behind statement failed: %r (%s)", e, w.sql)
+                        _resolve(w, e)
+                    else:
+                        _resolve(w, None)
+                return
+        except Exception as e:
+            # don't leave execute() callers waiting on a batch that went nowhere
+            for w in batch:
+                _resolve(w, e)
+            raise
+        for w in batch:
+            _resolve(w, None)
+
+
+def _apply(db: sqlite3.Connection, w: _Write) -> None:
+    if w.many:
+        db.executemany(w.sql, w.params)
+    else:
+        db.execute(w.sql, w.params)
+
+
+def _resolve(w: _Write, error: Optional[BaseException]) -> None:
+    fut = w.done
+    if fut is None:
+        return
+    loop = fut.get_loop()
+
+    def _set() -> None:
+        if fut.done():
+            return
+        if error is None:
+            fut.set_result(None)
+        else:
+            fut.set_exception(error)
+
+    loop.call_soon_threadsafe(_set)
@@ -1,6 +1,18 @@
 import asyncio
 from services.job_processor import JobProcessor
+from services.negotiation_sync import NegotiationSync
+from storage.maintenance import DatabaseMaintenance
 
 
-async def start_scheduler(proc: JobProcessor, period_sec: int = 300) -> None:
-    asyncio.create_task(proc.loop(period_sec))
+async def start_scheduler(proc: JobProcessor, period_sec: int = 300) -> asyncio.Task:
+    return asyncio.create_task(proc.loop(period_sec))
+
+
+async def start_negotiation_sync(
+    sync: NegotiationSync, period_sec: int = 1800
+) -> asyncio.Task:
+    return asyncio.create_task(sync.loop(period_sec))
+
+
+async def start_maintenance(maintenance: DatabaseMaintenance) -> asyncio.Task:
+    return asyncio.create_task(maintenance.loop())
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from hh.detail_cache import VacancyDetailCache
+from hh.models import VacancyDetail
+
+
+def _detail(vacancy_id: str) -> VacancyDetail:
+    return VacancyDetail(
+        id=vacancy_id,
+        archived=False,
+        has_test=True,
+        test_required=False,
+        response_letter_required=False,
+        description="",
+    )
+
+
+class _Fetcher:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, vacancy_id: str) -> VacancyDetail:
+        self.calls += 1
+        await self.release.wait()
+        return _detail(vacancy_id)
+
+
+def test_concurrent_misses_share_one_fetch() -> None:
+    async def scenario() -> None:
+        fetch = _Fetcher()
+        cache = VacancyDetailCache(fetch)
+        waiters = [asyncio.create_task(cache.get("1")) for _ in range(5)]
+        await asyncio.sleep(0)
+        fetch.release.set()
+        details = await asyncio.gather(*waiters)
+
+        assert details == [_detail("1")] * 5
+        assert fetch.calls == 1
+        assert cache.coalesced == 4
+        assert await cache.get("1") == _detail("1")
+        assert fetch.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_the_first_caller_keeps_the_fetch_for_the_others() -> None:
+    async def scenario() -> None:
+        fetch = _Fetcher()
+        cache = VacancyDetailCache(fetch)
+        owner = asyncio.create_task(cache.get("1"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get("1"))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        fetch.release.set()
+
+        assert await waiter == _detail("1")
+        assert fetch.calls == 1
+        assert cache.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,38 @@
+import asyncio
+
+from services.fair_queue import FairQueue
+from services.pipeline import Stage
+
+
+def test_drop_wakes_blocked_producer() -> None:
+    async def scenario() -> list[str]:
+        release = asyncio.Event()
+        handled: list[str] = []
+        queue: FairQueue[str, str] = FairQueue(2)
+
+        async def handle(entry: tuple[str, str]) -> None:
+            key, item = entry
+            if item == "a1":
+                await release.wait()
+                queue.drop("a")
+            handled.append(item)
+
+        stage = Stage("apply", handle, concurrency=1, queue=queue)
+        stage.start()
+        try:
+            await stage.put(("a", "a1", 1.0))
+            await asyncio.sleep(0)
+            await stage.put(("a", "a2", 1.0))
+            await stage.put(("a", "a3", 1.0))
+            assert queue.full()
+            producer = asyncio.create_task(stage.put(("b", "b1", 1.0)))
+            await asyncio.sleep(0)
+            assert not producer.done()
+
+            release.set()
+            await asyncio.wait_for(asyncio.gather(producer, stage.drain()), 1)
+        finally:
+            await stage.stop()
+        return handled
+
+    assert asyncio.run(scenario()) == ["a1", "b1"]
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from config.settings import Settings
+from hh.client import HHClient
+from services.job_processor import JobProcessor
+from storage.sqlite_impl import Filters, SQLiteRepository
+
+PAGES = 5
+PER_PAGE = 100
+
+
+def _vacancy(page: int, i: int) -> dict[str, Any]:
+    vid = f"{page}-{i}"
+    return {
+        "id": vid,
+        "name": f"Python разработчик {vid}",
+        "alternate_url": f"https://hh.ru/vacancy/{vid}",
+        "has_test": False,
+        "response_letter_required": False,
+        "archived": False,
+    }
+
+
+class _Bot:
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        pass
+
+
+async def _fetched_pages(tmp_path: Path, frequency: int) -> list[int]:
+    pages: list[int] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/vacancies":
+            page = int(request.url.params["page"])
+            pages.append(page)
+            items = [_vacancy(page, i) for i in range(PER_PAGE)]
+            return httpx.Response(
+                200,
+                content=json.dumps({"items": items, "pages": PAGES, "page": page}),
+            )
+        if request.url.path == "/negotiations":
+            return httpx.Response(201)
+        return httpx.Response(404)
+
+    settings = Settings(
+        telegram_token="42:test",
+        hh_client_id="test",
+        hh_client_secret="test",
+        oauth_redirect_uri="http://localhost/oauth/callback",
+        database_url=str(tmp_path),
+    )
+    repo = SQLiteRepository(str(tmp_path))
+    await repo.init()
+    await repo.save_token(1, "access", "refresh", 3600)
+    await repo.set_filters(
+        1,
+        Filters(
+            is_applying=True, resume_id="r1", search_text="python", frequency=frequency
+        ),
+    )
+    await repo.flush()
+    hh = HHClient(settings)
+    hh.transport = httpx.MockTransport(handler)
+    processor = JobProcessor(
+        repo, hh, _Bot(), None, apply_delay=0, per_page=PER_PAGE  # type: ignore[arg-type]
+    )
+    try:
+        await processor.run_once()
+    finally:
+        await hh.aclose()
+        await repo.close()
+    return pages
+
+
+@pytest.mark.parametrize(
+    "frequency, pages",
+    [
+        # pool of 6, page 0 alone covers it
+        (2, [0]),
+        # pool of 150 needs a second page but not a third
+        (50, [0, 1]),
+    ],
+)
+def test_search_stops_at_the_page_that_covers_the_pool(
+    tmp_path: Path, frequency: int, pages: list[int]
+) -> None:
+    assert asyncio.run(_fetched_pages(tmp_path, frequency)) == pages